@@ -62,6 +62,8 @@ class ConfigManager:
     # Tests require custom config path
     def __init__(self, config_file: str = ROMM_USER_CONFIG_FILE):
         self.config_file = config_file
+        self._raw_config: dict = {}
+        self._config_file_version: tuple[int, int] | None = None
         # If config file doesn't exists, create an empty one
         if not os.path.exists(config_file):
             Path(ROMM_USER_CONFIG_PATH).mkdir(parents=True, exist_ok=True)
@@ -197,7 +199,17 @@ class ConfigManager:
             )
             sys.exit(3)
 
-    def get_config(self) -> None:
+    def get_config(self) -> Config:
+        # Only parse the file again when it changed on disk
+        try:
+            stat = os.stat(self.config_file)
+            config_file_version = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            config_file_version = None
+
+        if config_file_version and config_file_version == self._config_file_version:
+            return self.config
+
         try:
             with open(self.config_file) as config_file:
                 self._raw_config = yaml.load(config_file, Loader=SafeLoader) or {}
@@ -209,10 +221,13 @@ class ConfigManager:
 
         self._parse_config()
         self._validate_config()
+        self._config_file_version = config_file_version
 
         return self.config
 
     def update_config_file(self) -> None:
+        # Make the next get_config read back what was written (or failed to)
+        self._config_file_version = None
         self._raw_config = {
             "exclude": {
                 "platforms": self.config.EXCLUDED_PLATFORMS,
@@ -20,6 +20,18 @@ def test_config_loader():
     assert loader.config.ROMS_FOLDER_NAME == "ROMS"
 
 
+def test_config_loader_reloads_changed_file(tmp_path):
+    config_file = tmp_path / "config.yml"
+    config_file.write_text("exclude:\n  platforms: ['romm']\n")
+    loader = ConfigManager(str(config_file))
+
+    config = loader.get_config()
+    assert loader.get_config() is config
+
+    config_file.write_text("exclude:\n  platforms: ['romm', 'bios']\n")
+    assert loader.get_config().EXCLUDED_PLATFORMS == ["romm", "bios"]
+
+
 def test_empty_config_loader():
     loader = ConfigManager("config/tests/fixtures/config/empty_config.yml")
 
@@ -21,13 +21,26 @@ def get_config() -> ConfigResponse:
     """
 
     try:
-        return cm.get_config().__dict__
+        config = cm.get_config()
     except ConfigNotReadableException as e:
         log.critical(e.message)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=e.message
         )
 
+    return ConfigResponse(
+        EXCLUDED_PLATFORMS=config.EXCLUDED_PLATFORMS,
+        EXCLUDED_SINGLE_EXT=config.EXCLUDED_SINGLE_EXT,
+        EXCLUDED_SINGLE_FILES=config.EXCLUDED_SINGLE_FILES,
+        EXCLUDED_MULTI_FILES=config.EXCLUDED_MULTI_FILES,
+        EXCLUDED_MULTI_PARTS_EXT=config.EXCLUDED_MULTI_PARTS_EXT,
+        EXCLUDED_MULTI_PARTS_FILES=config.EXCLUDED_MULTI_PARTS_FILES,
+        PLATFORMS_BINDING=config.PLATFORMS_BINDING,
+        PLATFORMS_VERSIONS=config.PLATFORMS_VERSIONS,
+        ROMS_FOLDER_NAME=config.ROMS_FOLDER_NAME,
+        HIGH_PRIO_STRUCTURE_PATH=config.HIGH_PRIO_STRUCTURE_PATH,
+    )
+
 
 @protected_route(router.post, "/config/system/platforms", ["platforms.write"])
 async def add_platform_binding(request: Request) -> MessageResponse:
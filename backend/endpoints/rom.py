@@ -261,7 +261,7 @@ async def update_rom(
     cleaned_data["igdb_id"] = data.get("igdb_id", db_rom.igdb_id) or None
 
     if cleaned_data["igdb_id"]:
-        igdb_rom = igdb_handler.get_rom_by_id(cleaned_data["igdb_id"])
+        igdb_rom = await igdb_handler.get_rom_by_id(cleaned_data["igdb_id"])
         cleaned_data.update(igdb_rom)
 
     cleaned_data["name"] = data.get("name", db_rom.name)
@@ -298,7 +298,7 @@ async def update_rom(
         fs_safe_file_name
     )
     cleaned_data.update(
-        fs_resource_handler.get_rom_cover(
+        await fs_resource_handler.get_rom_cover(
             overwrite=True,
             platform_fs_slug=platform_fs_slug,
             rom_name=cleaned_data["name"],
@@ -307,7 +307,7 @@ async def update_rom(
     )
 
     cleaned_data.update(
-        fs_resource_handler.get_rom_screenshots(
+        await fs_resource_handler.get_rom_screenshots(
             platform_fs_slug=platform_fs_slug,
             rom_name=cleaned_data["name"],
             url_screenshots=cleaned_data.get("url_screenshots", []),
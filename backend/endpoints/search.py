@@ -1,5 +1,7 @@
+import logging
+
 import emoji
-from handler.scan_handler import _get_main_platform_igdb_id
+from handler.scan_handler import get_main_platform_igdb_id
 from decorators.auth import protected_route
 from endpoints.responses.search import SearchRomSchema
 from fastapi import APIRouter, Request, HTTPException, status
@@ -36,13 +38,14 @@ async def search_rom(
     search_term = search_term or rom.file_name_no_tags
 
     log.info(emoji.emojize(":magnifying_glass_tilted_right: IGDB Searching"))
-    matched_roms: list = []
 
     log.info(f"Searching by {search_by.lower()}: {search_term}")
     log.info(emoji.emojize(f":video_game: {rom.platform_slug}: {rom.file_name}"))
     if search_by.lower() == "id":
         try:
-            matched_roms = igdb_handler.get_matched_roms_by_id(int(search_term))
+            matched_roms = await igdb_handler.get_matched_roms_by_id(
+                int(search_term)
+            )
         except ValueError:
             log.error(f"Search error: invalid ID '{search_term}'")
             raise HTTPException(
@@ -50,14 +53,15 @@ async def search_rom(
                 detail=f"Tried searching by ID, but '{search_term}' is not a valid ID",
             )
     elif search_by.lower() == "name":
-        matched_roms = igdb_handler.get_matched_roms_by_name(
-            search_term, _get_main_platform_igdb_id(rom.platform), search_extended
+        matched_roms = await igdb_handler.get_matched_roms_by_name(
+            search_term,
+            await get_main_platform_igdb_id(rom.platform),
+            search_extended,
         )
+    else:
+        matched_roms = []
 
-    log.info("Results:")
-    results = []
-    for m_rom in matched_roms:
-        log.info(f"\t - {m_rom['name']}")
-        results.append(m_rom)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Results: %s", [m_rom["name"] for m_rom in matched_roms])
 
-    return results
+    return matched_roms
@@ -1,3 +1,6 @@
+import asyncio
+from typing import Final
+
 import emoji
 import socketio  # type: ignore
 from endpoints.platform import PlatformSchema
@@ -11,14 +14,21 @@ from handler import (
     db_rom_handler,
     fs_platform_handler,
     fs_rom_handler,
+    igdb_handler,
     socket_handler,
 )
 from handler.redis_handler import high_prio_queue, redis_url
 from handler.scan_handler import (
+    get_main_platform_igdb_id,
     scan_platform,
     scan_rom,
 )
 from logger.logger import log
+from models.rom import Rom
+from utils.context import initialize_context
+
+# IGDB requests are bounded separately by the handler
+SCAN_ROMS_CONCURRENCY: Final = 16
 
 
 def _get_socket_manager():
@@ -26,6 +36,7 @@ def _get_socket_manager():
     return socketio.AsyncRedisManager(redis_url, write_only=True)
 
 
+@initialize_context()
 async def scan_platforms(
     platform_ids: list[int],
     complete_rescan: bool = False,
@@ -63,9 +74,12 @@ async def scan_platforms(
         else:
             log.info(f"Found {len(platform_list)} platforms in file system ")
 
+        fs_platforms_set = frozenset(fs_platforms)
         for platform_slug in platform_list:
             platform = db_platform_handler.get_platform_by_fs_slug(platform_slug)
-            scanned_platform = scan_platform(platform_slug, fs_platforms)
+            scanned_platform = await scan_platform(
+                platform_slug, fs_platforms_set, platform, complete_rescan
+            )
 
             if platform:
                 scanned_platform.id = platform.id
@@ -91,6 +105,7 @@ async def scan_platforms(
             else:
                 log.info(f"  {len(fs_roms)} roms found")
 
+            roms_to_scan = []
             for fs_rom in fs_roms:
                 rom = db_rom_handler.get_rom_by_filename(
                     platform.id, fs_rom["file_name"]
@@ -101,7 +116,57 @@ async def scan_platforms(
                     or complete_rescan
                     or (rescan_unidentified and not rom.igdb_id)
                 ):
-                    scanned_rom = await scan_rom(platform, fs_rom)
+                    roms_to_scan.append((fs_rom, rom))
+
+            # Same for every rom of the platform, resolve it once
+            roms_path = fs_rom_handler.get_fs_structure(platform.fs_slug)
+
+            # New roms named like an identified one (other regions, revisions...)
+            # are the same game, they don't need to be searched in IGDB
+            known_igdb_ids = db_rom_handler.get_igdb_ids_by_name_no_tags(platform.id)
+            sibling_igdb_ids = {
+                fs_rom["file_name"]: igdb_id
+                for fs_rom, rom in roms_to_scan
+                if not rom
+                and (
+                    igdb_id := known_igdb_ids.get(
+                        fs_rom_handler.get_file_name_with_no_tags(fs_rom["file_name"])
+                    )
+                )
+            }
+
+            # Exact name matches are fetched in a few requests for the whole platform
+            main_platform_igdb_id = await get_main_platform_igdb_id(platform)
+            igdb_roms = await igdb_handler.get_roms_batch(
+                [
+                    fs_rom["file_name"]
+                    for fs_rom, _ in roms_to_scan
+                    if fs_rom["file_name"] not in sibling_igdb_ids
+                ],
+                main_platform_igdb_id,
+            )
+
+            # Roms are independent, overlap their IGDB lookups and downloads
+            scan_semaphore = asyncio.Semaphore(SCAN_ROMS_CONCURRENCY)
+
+            async def scan_and_store_rom(fs_rom: dict, rom: Rom | None) -> None:
+                async with scan_semaphore:
+                    igdb_handler_rom = igdb_roms.get(fs_rom["file_name"], None)
+                    if fs_rom["file_name"] in sibling_igdb_ids:
+                        sibling_rom = await igdb_handler.get_rom_by_id(
+                            sibling_igdb_ids[fs_rom["file_name"]]
+                        )
+                        # Fall back to searching if the game couldn't be fetched
+                        if sibling_rom["slug"]:
+                            igdb_handler_rom = sibling_rom
+
+                    scanned_rom = await scan_rom(
+                        platform,
+                        fs_rom,
+                        igdb_handler_rom=igdb_handler_rom,
+                        main_platform_igdb_id=main_platform_igdb_id,
+                        roms_path=roms_path,
+                    )
                     if rom:
                         scanned_rom.id = rom.id
 
@@ -118,6 +183,21 @@ async def scan_platforms(
                         },
                     )
 
+            scan_tasks = [
+                asyncio.create_task(scan_and_store_rom(fs_rom, rom))
+                for fs_rom, rom in roms_to_scan
+            ]
+            try:
+                await asyncio.gather(*scan_tasks)
+            finally:
+                # A failed rom aborts the scan, stop the other roms before the
+                # httpx client they share is closed on the way out
+                for task in scan_tasks:
+                    task.cancel()
+                await asyncio.gather(*scan_tasks, return_exceptions=True)
+
+            # Like when it ran per rom, an empty (e.g. unmounted) folder purges nothing
+            if fs_roms:
                 db_rom_handler.purge_roms(
                     platform.id, [rom["file_name"] for rom in fs_roms]
                 )
@@ -80,6 +80,18 @@ class DBRomsHandler(DBHandler):
             select(Rom).filter_by(file_name_no_ext=file_name_no_ext).limit(1)
         ).first()
 
+    @begin_session
+    def get_igdb_ids_by_name_no_tags(
+        self, platform_id: int, session: Session = None
+    ) -> dict[str, int]:
+        """Maps the tagless file names of identified roms to their IGDB id"""
+        rows = session.execute(
+            select(Rom.file_name_no_tags, Rom.igdb_id).filter(
+                Rom.platform_id == platform_id, Rom.igdb_id.is_not(None)
+            )
+        )
+        return {name_no_tags: igdb_id for name_no_tags, igdb_id in rows}
+
     @begin_session
     def update_rom(self, id: int, data: dict, session: Session = None):
         return session.execute(
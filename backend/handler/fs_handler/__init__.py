@@ -60,13 +60,13 @@ REGIONS = [
 ]
 
 REGIONS_BY_SHORTCODE = {region[0].lower(): region[1] for region in REGIONS}
-REGIONS_NAME_KEYS = [region[1].lower() for region in REGIONS]
+REGIONS_NAME_KEYS = frozenset(region[1].lower() for region in REGIONS)
 
 LANGUAGES_BY_SHORTCODE = {lang[0].lower(): lang[1] for lang in LANGUAGES}
-LANGUAGES_NAME_KEYS = [lang[1].lower() for lang in LANGUAGES]
+LANGUAGES_NAME_KEYS = frozenset(lang[1].lower() for lang in LANGUAGES)
 
-TAG_REGEX = r"\(([^)]+)\)|\[([^]]+)\]"
-EXTENSION_REGEX = r"\.(([a-z]+\.)*\w+)$"
+TAG_REGEX = re.compile(r"\(([^)]+)\)|\[([^]]+)\]")
+EXTENSION_REGEX = re.compile(r"\.(([a-z]+\.)*\w+)$")
 
 
 class CoverSize(Enum):
@@ -85,12 +85,31 @@ class FSHandler(ABC):
         pass
 
     def get_file_name_with_no_extension(self, file_name: str) -> str:
-        return re.sub(EXTENSION_REGEX, "", file_name).strip()
+        return EXTENSION_REGEX.sub("", file_name).strip()
 
     def get_file_name_with_no_tags(self, file_name: str) -> str:
         file_name_no_extension = self.get_file_name_with_no_extension(file_name)
-        return re.split(TAG_REGEX, file_name_no_extension)[0].strip()
+        return TAG_REGEX.split(file_name_no_extension)[0].strip()
 
     def parse_file_extension(self, file_name) -> str:
-        match = re.search(EXTENSION_REGEX, file_name)
+        match = EXTENSION_REGEX.search(file_name)
         return match.group(1) if match else ""
+
+    def parse_file_name(self, file_name: str) -> tuple[str, str, str]:
+        """Same as the three helpers above, with a single pass of the extension regex
+
+        Returns:
+            Tuple of (file name with no tags, file name with no extension, extension)
+        """
+        match = EXTENSION_REGEX.search(file_name)
+        if match:
+            file_name_no_ext = (
+                file_name[: match.start()] + file_name[match.end() :]
+            ).strip()
+            file_extension = match.group(1)
+        else:
+            file_name_no_ext = file_name.strip()
+            file_extension = ""
+
+        file_name_no_tags = TAG_REGEX.split(file_name_no_ext)[0].strip()
+        return file_name_no_tags, file_name_no_ext, file_extension
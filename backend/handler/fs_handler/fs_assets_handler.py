@@ -1,3 +1,4 @@
+import functools
 import os
 import shutil
 from pathlib import Path
@@ -9,6 +10,19 @@ from models.user import User
 from config import ASSETS_BASE_PATH
 
 
+# Only depends on plain strings, the same few paths are built for every asset
+@functools.lru_cache(maxsize=512)
+def _join_asset_file_path(
+    user_folder_path: str,
+    folder: str,
+    platform_fs_slug: str,
+    emulator: str | None = None,
+) -> str:
+    if emulator:
+        return os.path.join(user_folder_path, folder, platform_fs_slug, emulator)
+    return os.path.join(user_folder_path, folder, platform_fs_slug)
+
+
 class FSAssetsHandler(FSHandler):
     def __init__(self) -> None:
         pass
@@ -40,10 +54,9 @@ class FSAssetsHandler(FSHandler):
     def _build_asset_file_path(
         self, user: User, folder: str, platform_fs_slug, emulator: str = None
     ):
-        user_folder_path = self.user_folder_path(user)
-        if emulator:
-            return os.path.join(user_folder_path, folder, platform_fs_slug, emulator)
-        return os.path.join(user_folder_path, folder, platform_fs_slug)
+        return _join_asset_file_path(
+            self.user_folder_path(user), folder, platform_fs_slug, emulator
+        )
 
     # /users/557365723a31/saves/n64/mupen64plus
     def build_saves_file_path(
@@ -1,9 +1,11 @@
+import asyncio
+import contextlib
 import os
-import shutil
 from pathlib import Path
+from typing import Final
 from urllib.parse import quote
 
-import requests
+import httpx
 from config import RESOURCES_BASE_PATH
 from fastapi import HTTPException, status
 from handler.fs_handler import (
@@ -14,14 +16,32 @@ from handler.fs_handler import (
     CoverSize,
     FSHandler,
 )
+from handler.redis_handler import cache
 from logger.logger import log
 from PIL import Image
-from urllib3.exceptions import ProtocolError
+from utils.context import ctx_httpx_client
+
+# Unused ETags expire instead of piling up after their rom is removed
+SCREENSHOT_ETAG_TTL: Final = 2592000  # 30 days
 
 
 class FSResourceHandler(FSHandler):
     def __init__(self) -> None:
-        pass
+        self._inflight_downloads: dict[str, asyncio.Future] = {}
+
+    async def _download_once(self, file_path: str, download, *args) -> None:
+        # Roms of the same game scanned concurrently share their resources folder,
+        # a download already running for the same file is awaited instead
+        inflight = self._inflight_downloads.get(file_path, None)
+        if inflight:
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(download(*args))
+        self._inflight_downloads[file_path] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._inflight_downloads.pop(file_path, None)
 
     def _cover_exists(self, fs_slug: str, rom_name: str, size: CoverSize):
         """Check if rom cover exists in filesystem
@@ -73,7 +93,7 @@ class FSResourceHandler(FSHandler):
             rgb_background = background.convert("RGB")
             rgb_background.save(cover_path)
 
-    def _store_cover(
+    async def _store_cover(
         self, fs_slug: str, rom_name: str, url_cover: str, size: CoverSize
     ):
         """Store roms resources in filesystem
@@ -86,24 +106,23 @@ class FSResourceHandler(FSHandler):
         """
         cover_file = f"{size.value}.png"
         cover_path = f"{RESOURCES_BASE_PATH}/{fs_slug}/{rom_name}/cover"
-        
+        httpx_client = ctx_httpx_client.get()
+
         try:
-            res = requests.get(
-                url_cover.replace("t_thumb", f"t_cover_{size.value}"),
-                stream=True,
-                timeout=120,
+            res = await httpx_client.get(
+                url_cover.replace("t_thumb", f"t_cover_{size.value}")
             )
-        except requests.exceptions.ConnectionError:
+        except httpx.NetworkError:
             log.critical("Connection error: can't connect to IGDB")
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Can't connect to IGDB, check your internet connection.",
             )
-        
+
         if res.status_code == 200:
             Path(cover_path).mkdir(parents=True, exist_ok=True)
             with open(f"{cover_path}/{cover_file}", "wb") as f:
-                shutil.copyfileobj(res.raw, f)
+                f.write(res.content)
             self.resize_cover(f"{cover_path}/{cover_file}", size)
 
     def _get_cover_path(self, fs_slug: str, rom_name: str, size: CoverSize):
@@ -116,26 +135,32 @@ class FSResourceHandler(FSHandler):
         """
         return f"{fs_slug}/{rom_name}/cover/{size.value}.png"
 
-    def get_rom_cover(
+    async def get_rom_cover(
         self, overwrite: bool, platform_fs_slug: str, rom_name: str, url_cover: str = ""
     ) -> dict:
         q_rom_name = quote(rom_name)
-        if (
-            overwrite
-            or not self._cover_exists(platform_fs_slug, rom_name, CoverSize.SMALL)
-        ) and url_cover:
-            self._store_cover(platform_fs_slug, rom_name, url_cover, CoverSize.SMALL)
+        if url_cover:
+            # Both sizes come from the same host, download them at once
+            await asyncio.gather(
+                *(
+                    self._download_once(
+                        f"{platform_fs_slug}/{rom_name}/cover/{size.value}",
+                        self._store_cover,
+                        platform_fs_slug,
+                        rom_name,
+                        url_cover,
+                        size,
+                    )
+                    for size in (CoverSize.SMALL, CoverSize.BIG)
+                    if overwrite
+                    or not self._cover_exists(platform_fs_slug, rom_name, size)
+                )
+            )
         path_cover_s = (
             self._get_cover_path(platform_fs_slug, q_rom_name, CoverSize.SMALL)
             if self._cover_exists(platform_fs_slug, rom_name, CoverSize.SMALL)
             else ""
         )
-
-        if (
-            overwrite
-            or not self._cover_exists(platform_fs_slug, rom_name, CoverSize.BIG)
-        ) and url_cover:
-            self._store_cover(platform_fs_slug, rom_name, url_cover, CoverSize.BIG)
         path_cover_l = (
             self._get_cover_path(platform_fs_slug, q_rom_name, CoverSize.BIG)
             if self._cover_exists(platform_fs_slug, rom_name, CoverSize.BIG)
@@ -158,7 +183,9 @@ class FSResourceHandler(FSHandler):
         Path(artwork_path).mkdir(parents=True, exist_ok=True)
         return path_cover_l, path_cover_s, artwork_path
 
-    def _store_screenshot(self, fs_slug: str, rom_name: str, url: str, idx: int):
+    async def _store_screenshot(
+        self, fs_slug: str, rom_name: str, url: str, idx: int
+    ):
         """Store roms resources in filesystem
 
         Args:
@@ -168,25 +195,63 @@ class FSResourceHandler(FSHandler):
         """
         screenshot_file = f"{idx}.jpg"
         screenshot_path = f"{RESOURCES_BASE_PATH}/{fs_slug}/{rom_name}/screenshots"
-        
+        screenshot_file_path = f"{screenshot_path}/{screenshot_file}"
+        httpx_client = ctx_httpx_client.get()
+
+        # Screenshots are downloaded on every scan, only fetch the ones that changed
+        etag_key = f"romm:screenshot_etag:{fs_slug}/{rom_name}/{screenshot_file}"
+        headers = {}
+        if os.path.exists(screenshot_file_path):
+            etag = cache.get(etag_key)  # type: ignore[attr-defined]
+            if etag:
+                headers["If-None-Match"] = etag
+
+        # On any failure the file on disk may no longer match the cached ETag,
+        # drop it so the next scan downloads the screenshot again
         try:
-            res = requests.get(url, stream=True, timeout=120)
-        except requests.exceptions.ConnectionError:
+            res = await httpx_client.get(url, headers=headers)
+        except httpx.RemoteProtocolError:
+            log.warning(f"Failure writing screenshot {url} to file (ProtocolError)")
+            cache.delete(etag_key)  # type: ignore[attr-defined]
+            return
+        except httpx.NetworkError:
             log.critical("Connection error: can't connect to IGDB")
+            cache.delete(etag_key)  # type: ignore[attr-defined]
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Can't connect to IGDB, check your internet connection.",
             )
-        
-        if res.status_code == 200:
-            Path(screenshot_path).mkdir(parents=True, exist_ok=True)
-            with open(f"{screenshot_path}/{screenshot_file}", "wb") as f:
-                try:
-                    shutil.copyfileobj(res.raw, f)
-                except ProtocolError:
-                    log.warning(
-                        f"Failure writing screenshot {url} to file (ProtocolError)"
-                    )
+        except BaseException:
+            cache.delete(etag_key)  # type: ignore[attr-defined]
+            raise
+
+        # 304 means the screenshot on disk is still the same
+        if res.status_code == 304:
+            return
+
+        if res.status_code != 200:
+            cache.delete(etag_key)  # type: ignore[attr-defined]
+            return
+
+        # Written aside and moved into place, a failed write never truncates
+        # the previous screenshot
+        Path(screenshot_path).mkdir(parents=True, exist_ok=True)
+        tmp_file_path = f"{screenshot_file_path}.tmp"
+        try:
+            with open(tmp_file_path, "wb") as f:
+                f.write(res.content)
+            os.replace(tmp_file_path, screenshot_file_path)
+        except BaseException:
+            cache.delete(etag_key)  # type: ignore[attr-defined]
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_file_path)
+            raise
+
+        etag = res.headers.get("ETag", None)
+        if etag:
+            cache.set(etag_key, etag, ex=SCREENSHOT_ETAG_TTL)  # type: ignore[attr-defined]
+        else:
+            cache.delete(etag_key)  # type: ignore[attr-defined]
 
     def _get_screenshot_path(self, fs_slug: str, rom_name: str, idx: str):
         """Returns rom cover filesystem path adapted to frontend folder structure
@@ -198,16 +263,27 @@ class FSResourceHandler(FSHandler):
         """
         return f"{fs_slug}/{rom_name}/screenshots/{idx}.jpg"
 
-    def get_rom_screenshots(
+    async def get_rom_screenshots(
         self, platform_fs_slug: str, rom_name: str, url_screenshots: list
     ) -> dict:
         q_rom_name = quote(rom_name)
 
-        path_screenshots: list[str] = []
-        for idx, url in enumerate(url_screenshots):
-            self._store_screenshot(platform_fs_slug, rom_name, url, idx)
-            path_screenshots.append(
-                self._get_screenshot_path(platform_fs_slug, q_rom_name, str(idx))
+        await asyncio.gather(
+            *(
+                self._download_once(
+                    f"{platform_fs_slug}/{rom_name}/screenshots/{idx}",
+                    self._store_screenshot,
+                    platform_fs_slug,
+                    rom_name,
+                    url,
+                    idx,
+                )
+                for idx, url in enumerate(url_screenshots)
             )
+        )
+        path_screenshots: list[str] = [
+            self._get_screenshot_path(platform_fs_slug, q_rom_name, str(idx))
+            for idx in range(len(url_screenshots))
+        ]
 
         return {"path_screenshots": path_screenshots}
@@ -8,6 +8,7 @@ from config import LIBRARY_BASE_PATH
 from config.config_manager import config_manager as cm
 from exceptions.fs_exceptions import RomAlreadyExistsException, RomsNotFoundException
 from handler.fs_handler import (
+    EXTENSION_REGEX,
     LANGUAGES_BY_SHORTCODE,
     LANGUAGES_NAME_KEYS,
     REGIONS_BY_SHORTCODE,
@@ -17,6 +18,9 @@ from handler.fs_handler import (
 )
 from models.platform import Platform
 
+REGION_TAG_REGEX = re.compile(r"^reg[\s|-](.*)$", re.IGNORECASE)
+REVISION_TAG_REGEX = re.compile(r"^rev[\s|-](.*)$", re.IGNORECASE)
+
 
 class FSRomsHandler(FSHandler):
     def __init__(self) -> None:
@@ -36,44 +40,44 @@ class FSRomsHandler(FSHandler):
         except IsADirectoryError:
             shutil.rmtree(f"{LIBRARY_BASE_PATH}/{file_path}/{file_name}")
 
-    def parse_tags(self, file_name: str) -> tuple:
+    def _classify_tags(self, raw_tags: list[str]) -> tuple:
         rev = ""
         regs = []
         langs = []
         other_tags = []
-        tags = [tag[0] or tag[1] for tag in re.findall(TAG_REGEX, file_name)]
-        tags = [tag for subtags in tags for tag in subtags.split(",")]
-        tags = [tag.strip() for tag in tags]
+        tags = [tag.strip() for subtags in raw_tags for tag in subtags.split(",")]
 
         for tag in tags:
-            if tag.lower() in REGIONS_BY_SHORTCODE.keys():
-                regs.append(REGIONS_BY_SHORTCODE[tag.lower()])
+            tag_lower = tag.lower()
+
+            if tag_lower in REGIONS_BY_SHORTCODE:
+                regs.append(REGIONS_BY_SHORTCODE[tag_lower])
                 continue
 
-            if tag.lower() in REGIONS_NAME_KEYS:
+            if tag_lower in REGIONS_NAME_KEYS:
                 regs.append(tag)
                 continue
 
-            if tag.lower() in LANGUAGES_BY_SHORTCODE.keys():
-                langs.append(LANGUAGES_BY_SHORTCODE[tag.lower()])
+            if tag_lower in LANGUAGES_BY_SHORTCODE:
+                langs.append(LANGUAGES_BY_SHORTCODE[tag_lower])
                 continue
 
-            if tag.lower() in LANGUAGES_NAME_KEYS:
+            if tag_lower in LANGUAGES_NAME_KEYS:
                 langs.append(tag)
                 continue
 
-            if "reg" in tag.lower():
-                match = re.match(r"^reg[\s|-](.*)$", tag, re.IGNORECASE)
+            if "reg" in tag_lower:
+                match = REGION_TAG_REGEX.match(tag)
                 if match:
                     regs.append(
                         REGIONS_BY_SHORTCODE[match.group(1).lower()]
-                        if match.group(1).lower() in REGIONS_BY_SHORTCODE.keys()
+                        if match.group(1).lower() in REGIONS_BY_SHORTCODE
                         else match.group(1)
                     )
                     continue
 
-            if "rev" in tag.lower():
-                match = re.match(r"^rev[\s|-](.*)$", tag, re.IGNORECASE)
+            if "rev" in tag_lower:
+                match = REVISION_TAG_REGEX.match(tag)
                 if match:
                     rev = match.group(1)
                     continue
@@ -81,6 +85,51 @@ class FSRomsHandler(FSHandler):
             other_tags.append(tag)
         return regs, rev, langs, other_tags
 
+    def parse_tags(self, file_name: str) -> tuple:
+        return self._classify_tags(
+            [tag[0] or tag[1] for tag in TAG_REGEX.findall(file_name)]
+        )
+
+    def parse_all(self, file_name: str) -> tuple:
+        """Same as parse_file_name and parse_tags together, in one pass of each regex
+
+        Returns:
+            Tuple of (file name with no tags, file name with no extension, extension,
+            regions, revision, languages, other tags)
+        """
+        ext_match = EXTENSION_REGEX.search(file_name)
+        if ext_match:
+            ext_start = ext_match.start()
+            file_name_no_ext = (
+                file_name[:ext_start] + file_name[ext_match.end() :]
+            ).strip()
+            file_extension = ext_match.group(1)
+        else:
+            ext_start = len(file_name)
+            file_name_no_ext = file_name.strip()
+            file_extension = ""
+
+        tag_matches = list(TAG_REGEX.finditer(file_name))
+
+        # Tags come before the extension, the name ends where the first one starts
+        if tag_matches and tag_matches[0].start() < ext_start:
+            file_name_no_tags = file_name[: tag_matches[0].start()].strip()
+        else:
+            file_name_no_tags = file_name_no_ext
+
+        regs, rev, langs, other_tags = self._classify_tags(
+            [match.group(1) or match.group(2) for match in tag_matches]
+        )
+        return (
+            file_name_no_tags,
+            file_name_no_ext,
+            file_extension,
+            regs,
+            rev,
+            langs,
+            other_tags,
+        )
+
     def _exclude_files(self, files, filetype) -> list[str]:
         cnfg = cm.get_config()
         excluded_extensions = getattr(cnfg, f"EXCLUDED_{filetype.upper()}_EXT")
@@ -136,14 +185,10 @@ class FSRomsHandler(FSHandler):
         roms_path = self.get_fs_structure(platform.fs_slug)
         roms_file_path = f"{LIBRARY_BASE_PATH}/{roms_path}"
 
+        # Only the top level is needed, don't walk the whole tree
         try:
-            fs_single_roms: list[str] = list(os.walk(roms_file_path))[0][2]
-        except IndexError as exc:
-            raise RomsNotFoundException(platform.fs_slug) from exc
-
-        try:
-            fs_multi_roms: list[str] = list(os.walk(roms_file_path))[0][1]
-        except IndexError as exc:
+            _, fs_multi_roms, fs_single_roms = next(os.walk(roms_file_path))
+        except StopIteration as exc:
             raise RomsNotFoundException(platform.fs_slug) from exc
 
         fs_roms: list[dict] = [
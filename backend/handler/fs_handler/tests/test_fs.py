@@ -3,12 +3,14 @@ from unittest.mock import patch
 
 from handler import fs_resource_handler, fs_platform_handler, fs_rom_handler
 from models.platform import Platform
+from utils.context import initialize_context
 
 
 @pytest.mark.vcr
-def test_get_rom_cover():
+@initialize_context()
+async def test_get_rom_cover():
     # Game: Metroid Prime (EUR).iso
-    cover = fs_resource_handler.get_rom_cover(
+    cover = await fs_resource_handler.get_rom_cover(
         overwrite=False,
         platform_fs_slug="ngc",
         rom_name="Metroid Prime",
@@ -18,7 +20,7 @@ def test_get_rom_cover():
     assert "" in cover["path_cover_l"]
 
     # Game: Paper Mario (USA).z64
-    cover = fs_resource_handler.get_rom_cover(
+    cover = await fs_resource_handler.get_rom_cover(
         overwrite=True,
         platform_fs_slug="n64",
         rom_name="Paper Mario",
@@ -29,7 +31,7 @@ def test_get_rom_cover():
     assert "n64/Paper%20Mario/cover/big.png" in cover["path_cover_l"]
 
     # Game: Super Mario 64 (J) (Rev A)
-    cover = fs_resource_handler.get_rom_cover(
+    cover = await fs_resource_handler.get_rom_cover(
         overwrite=False,
         platform_fs_slug="n64",
         rom_name="Super Mario 64",
@@ -40,7 +42,7 @@ def test_get_rom_cover():
     assert "n64/Super%20Mario%2064/cover/big.png" in cover["path_cover_l"]
 
     # Game: Disney's Kim Possible: What's the Switch?.zip
-    cover = fs_resource_handler.get_rom_cover(
+    cover = await fs_resource_handler.get_rom_cover(
         overwrite=False,
         platform_fs_slug="ps2",
         rom_name="Disney's Kim Possible: What's the Switch?",
@@ -57,7 +59,7 @@ def test_get_rom_cover():
     )
 
     # Game: Fake Game.xyz
-    cover = fs_resource_handler.get_rom_cover(
+    cover = await fs_resource_handler.get_rom_cover(
         overwrite=False,
         platform_fs_slug="n64",
         rom_name="Fake Game",
@@ -309,3 +311,41 @@ def test_get_file_extension():
         fs_rom_handler.parse_file_extension("007 - Agent Under Fire.nkit.iso")
         == "nkit.iso"
     )
+
+
+def test_parse_file_name():
+    file_names = [
+        "Super Mario Bros. (World).nes",
+        "Super Mario Bros. (U) [!].nes",
+        "Super Mario Bros. (reg-T) (rev-1.2).nes",
+        "007 - Agent Under Fire.nkit.iso",
+        "Jimmy Houston's Bass Tournament U.S.A..zip",
+        "Battle Stadium D.O.N.zip",
+        "Super Mario 64 (J) (Rev A)",
+    ]
+
+    for file_name in file_names:
+        assert fs_rom_handler.parse_file_name(file_name) == (
+            fs_rom_handler.get_file_name_with_no_tags(file_name),
+            fs_rom_handler.get_file_name_with_no_extension(file_name),
+            fs_rom_handler.parse_file_extension(file_name),
+        )
+
+
+def test_parse_all():
+    file_names = [
+        "Super Mario Bros. (World).nes",
+        "Super Mario Bros. (USA) (Rev A) (Beta).nes",
+        "Super Mario Bros. (CH) [!].nes",
+        "Super Mario Bros. (reg-T) (rev-1.2).nes",
+        "Super Metroid (Japan, USA) (En,Ja).zip",
+        "007 - Agent Under Fire.nkit.iso",
+        "Battle Stadium D.O.N.zip",
+        "Super Mario 64 (J) (Rev A)",
+    ]
+
+    for file_name in file_names:
+        assert fs_rom_handler.parse_all(file_name) == (
+            *fs_rom_handler.parse_file_name(file_name),
+            *fs_rom_handler.parse_tags(file_name),
+        )
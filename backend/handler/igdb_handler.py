@@ -1,48 +1,102 @@
+import asyncio
 import functools
-import json
+import hashlib
 import os
+import random
 import re
 import sys
 import time
 from typing import Final, Optional
 
-import pydash
-import requests
+import httpx
+import orjson
 import xmltodict
 from config import IGDB_CLIENT_ID, IGDB_CLIENT_SECRET
 from fastapi import HTTPException, status
 from handler.redis_handler import cache
 from logger.logger import log
-from requests.exceptions import HTTPError, Timeout
 from tasks.update_mame_xml import update_mame_xml_task
 from tasks.update_switch_titledb import update_switch_titledb_task
 from typing_extensions import TypedDict
 from unidecode import unidecode as uc
+from utils.context import ctx_httpx_client
 
 MAIN_GAME_CATEGORY: Final = 0
 EXPANDED_GAME_CATEGORY: Final = 10
 N_SCREENSHOTS: Final = 5
 PS2_IGDB_ID: Final = 8
 SWITCH_IGDB_ID: Final = 130
-ARCADE_IGDB_IDS: Final = [52, 79, 80]
+ARCADE_IGDB_IDS: Final = frozenset({52, 79, 80})
 
-PS2_OPL_REGEX: Final = r"^([A-Z]{4}_\d{3}\.\d{2})\..*$"
+# Cache TTLs (in seconds) for IGDB responses
+REQUEST_CACHE_TTL: Final = 3600  # 1 hour
+SEARCH_CACHE_TTL: Final = 300  # 5 minutes
+GAME_CACHE_TTL: Final = 86400  # 1 day
+PLATFORM_CACHE_TTL: Final = 2592000  # 30 days, platform ids never change
+
+# Retries of failed IGDB requests
+REQUEST_MAX_ATTEMPTS: Final = 3
+REQUEST_RETRY_BASE_DELAY: Final = 1.0  # seconds
+REQUEST_MAX_RETRY_DELAY: Final = 30.0  # seconds
+RETRYABLE_STATUS_CODES: Final = frozenset({429, 500, 502, 503, 504})
+
+# IGDB rejects requests past 8 open at once
+MAX_CONCURRENT_REQUESTS: Final = 8
+
+# Stop calling IGDB for a while after consecutive failed requests
+CIRCUIT_BREAKER_FAIL_THRESHOLD: Final = 5
+CIRCUIT_BREAKER_COOLDOWN: Final = 30  # seconds
+
+TWITCH_TOKEN_EXPIRY_MARGIN: Final = 30  # seconds
+
+PS2_OPL_PATTERN: Final = re.compile(r"^([A-Z]{4}_\d{3}\.\d{2})\..*$")
 PS2_OPL_INDEX_FILE: Final = os.path.join(
     os.path.dirname(__file__), "fixtures", "ps2_opl_index.json"
 )
 
-SWITCH_TITLEDB_REGEX: Final = r"(70[0-9]{12})"
+SWITCH_TITLEDB_PATTERN: Final = re.compile(r"(70[0-9]{12})")
 SWITCH_TITLEDB_INDEX_FILE: Final = os.path.join(
     os.path.dirname(__file__), "fixtures", "switch_titledb.json"
 )
 
-SWITCH_PRODUCT_ID_REGEX: Final = r"(0100[0-9A-F]{12})"
+SWITCH_PRODUCT_ID_PATTERN: Final = re.compile(r"(0100[0-9A-F]{12})")
 SWITCH_PRODUCT_ID_FILE: Final = os.path.join(
     os.path.dirname(__file__), "fixtures", "switch_product_ids.json"
 )
 
 MAME_XML_FILE: Final = os.path.join(os.path.dirname(__file__), "fixtures", "mame.xml")
 
+# Trademark, registered, copyright and service mark symbols
+SEARCH_TERM_SYMBOLS_TABLE: Final = str.maketrans("", "", "\u2122\u00ae\u00a9\u2120")
+
+
+# Index files are only parsed once per process, failed loads (missing file) aren't cached
+@functools.lru_cache(maxsize=1)
+def _load_ps2_opl_index() -> dict:
+    with open(PS2_OPL_INDEX_FILE, "rb") as index_json:
+        return orjson.loads(index_json.read())
+
+
+@functools.lru_cache(maxsize=1)
+def _load_switch_titledb_index() -> dict:
+    with open(SWITCH_TITLEDB_INDEX_FILE, "rb") as index_json:
+        return orjson.loads(index_json.read())
+
+
+@functools.lru_cache(maxsize=1)
+def _load_switch_product_id_index() -> dict:
+    with open(SWITCH_PRODUCT_ID_FILE, "rb") as index_json:
+        return orjson.loads(index_json.read())
+
+
+@functools.lru_cache(maxsize=1)
+def _load_mame_index() -> dict:
+    with open(MAME_XML_FILE, "r") as index_xml:
+        mame_index = xmltodict.parse(index_xml.read())
+
+    # Index the games by name, the list holds tens of thousands of entries
+    return {game["@name"]: game for game in mame_index["menu"]["game"]}
+
 
 class IGDBPlatform(TypedDict):
     igdb_id: int
@@ -93,45 +147,80 @@ def extract_metadata_from_igdb_rom(rom: dict) -> IGDBMetadata:
             "total_rating": str(round(rom.get("total_rating", 0.0), 2)),
             "aggregated_rating": str(round(rom.get("aggregated_rating", 0.0), 2)),
             "first_release_date": rom.get("first_release_date", None),
-            "genres": pydash.map_(rom.get("genres", []), "name"),
-            "franchises": pydash.compact(
-                [rom.get("franchise.name", None)]
-                + pydash.map_(rom.get("franchises", []), "name")
-            ),
-            "alternative_names": pydash.map_(rom.get("alternative_names", []), "name"),
-            "collections": pydash.map_(rom.get("collections", []), "name"),
-            "game_modes": pydash.map_(rom.get("game_modes", []), "name"),
-            "companies": pydash.map_(rom.get("involved_companies", []), "company.name"),
+            "genres": [g.get("name", "") for g in rom.get("genres", [])],
+            "franchises": [
+                name
+                for name in [rom.get("franchise.name", None)]
+                + [f.get("name", "") for f in rom.get("franchises", [])]
+                if name
+            ],
+            "alternative_names": [
+                n.get("name", "") for n in rom.get("alternative_names", [])
+            ],
+            "collections": [c.get("name", "") for c in rom.get("collections", [])],
+            "game_modes": [m.get("name", "") for m in rom.get("game_modes", [])],
+            "companies": [
+                (c.get("company") or {}).get("name", "")
+                for c in rom.get("involved_companies", [])
+            ],
             "platforms": [
                 {"igdb_id": p.get("id", ""), "name": p.get("name", "")}
                 for p in rom.get("platforms", [])
             ],
             "expansions": [
-                {"cover_url": pydash.get(e, "cover.url", ""), "type": "expansion", **e}
+                {
+                    "cover_url": (e.get("cover") or {}).get("url", ""),
+                    "type": "expansion",
+                    **e,
+                }
                 for e in rom.get("expansions", [])
             ],
             "dlcs": [
-                {"cover_url": pydash.get(d, "cover.url", ""), "type": "dlc", **d}
+                {
+                    "cover_url": (d.get("cover") or {}).get("url", ""),
+                    "type": "dlc",
+                    **d,
+                }
                 for d in rom.get("dlcs", [])
             ],
             "remasters": [
-                {"cover_url": pydash.get(r, "cover.url", ""), "type": "remaster", **r}
+                {
+                    "cover_url": (r.get("cover") or {}).get("url", ""),
+                    "type": "remaster",
+                    **r,
+                }
                 for r in rom.get("remasters", [])
             ],
             "remakes": [
-                {"cover_url": pydash.get(r, "cover.url", ""), "type": "remake", **r}
+                {
+                    "cover_url": (r.get("cover") or {}).get("url", ""),
+                    "type": "remake",
+                    **r,
+                }
                 for r in rom.get("remakes", [])
             ],
             "expanded_games": [
-                {"cover_url": pydash.get(g, "cover.url", ""), "type": "expanded", **g}
+                {
+                    "cover_url": (g.get("cover") or {}).get("url", ""),
+                    "type": "expanded",
+                    **g,
+                }
                 for g in rom.get("expanded_games", [])
             ],
             "ports": [
-                {"cover_url": pydash.get(p, "cover.url", ""), "type": "port", **p}
+                {
+                    "cover_url": (p.get("cover") or {}).get("url", ""),
+                    "type": "port",
+                    **p,
+                }
                 for p in rom.get("ports", [])
             ],
             "similar_games": [
-                {"cover_url": pydash.get(s, "cover.url", ""), "type": "similar", **s}
+                {
+                    "cover_url": (s.get("cover") or {}).get("url", ""),
+                    "type": "similar",
+                    **s,
+                }
                 for s in rom.get("similar_games", [])
             ],
         }
@@ -148,123 +237,260 @@ class IGDBHandler:
         self.search_endpoint = "https://api.igdb.com/v4/search"
         self.search_fields = ["game.id", "name"]
         self.pagination_limit = 200
+        self._platforms_fields_str = ",".join(self.platforms_fields)
+        self._games_fields_str = ",".join(self.games_fields)
+        self._search_fields_str = ",".join(self.search_fields)
+        self._limit_suffix = f" limit {self.pagination_limit};".encode()
+        self._platforms_cache: dict[str, IGDBPlatform] = {}
+        self._inflight_requests: dict[str, asyncio.Future] = {}
+        self._requests_semaphore: asyncio.Semaphore | None = None
+        self._requests_semaphore_loop: asyncio.AbstractEventLoop | None = None
+        self._consecutive_failures = 0
+        self._circuit_opened_at = 0.0
+        self._circuit_probing = False
         self.twitch_auth = TwitchAuth()
+        # The Authorization header is set by check_twitch_token on first use
+        self._applied_token = ""
         self.headers = {
             "Client-ID": IGDB_CLIENT_ID,
-            "Authorization": f"Bearer {self.twitch_auth.get_oauth_token()}",
             "Accept": "application/json",
         }
 
     @staticmethod
     def check_twitch_token(func):
         @functools.wraps(func)
-        def wrapper(*args):
-            args[0].headers["Authorization"] = (
-                f"Bearer {args[0].twitch_auth.get_oauth_token()}"
-            )
-            return func(*args)
+        async def wrapper(*args):
+            # Only rewrite the header when the token has changed
+            token = await args[0].twitch_auth.get_oauth_token()
+            if token != args[0]._applied_token:
+                args[0].headers["Authorization"] = f"Bearer {token}"
+                args[0]._applied_token = token
+
+            return await func(*args)
 
         return wrapper
 
+    @staticmethod
+    def cache_request(func):
+        @functools.wraps(func)
+        async def wrapper(
+            self, url: str, data: str, *args, ttl: int = REQUEST_CACHE_TTL, **kwargs
+        ):
+            digest = hashlib.sha1(f"{url}|{data}".encode()).hexdigest()
+            key = f"romm:igdb_request:{digest}"
+            cached = cache.get(key)  # type: ignore[attr-defined]
+            if cached:
+                return orjson.loads(cached)
+
+            # Identical requests already in flight share the same response
+            inflight = self._inflight_requests.get(key, None)
+            if inflight:
+                return await asyncio.shield(inflight)
+
+            inflight = asyncio.ensure_future(func(self, url, data, *args, **kwargs))
+            self._inflight_requests[key] = inflight
+            try:
+                res = await asyncio.shield(inflight)
+            finally:
+                self._inflight_requests.pop(key, None)
 
-    def _request(self, url: str, data: str, timeout: int = 120) -> list:
-        try:
-            res = requests.post(
-                url,
-                f"{data} limit {self.pagination_limit};",
-                headers=self.headers,
-                timeout=timeout,
-            )
+            # Don't cache empty results, they may come from a failed request
+            if res:
+                cache.set(key, orjson.dumps(res).decode(), ex=ttl)  # type: ignore[attr-defined]
 
-            res.raise_for_status()
-            return res.json()
-        except requests.exceptions.ConnectionError:
-            log.critical("Connection error: can't connect to IGDB", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Can't connect to IGDB, check your internet connection",
-            )
-        except HTTPError as err:
-            # Retry once if the auth token is invalid
-            if err.response.status_code != 401:
-                log.error(err)
-                return []  # All requests to the IGDB API return a list
+            return res
 
-            # Attempt to force a token refresh if the token is invalid
-            log.warning("Twitch token invalid: fetching a new one...")
-            token = self.twitch_auth._update_twitch_token()
-            self.headers["Authorization"] = f"Bearer {token}"
-        except Timeout:
-            # Retry once the request if it times out
-            pass
+        return wrapper
 
-        try:
-            res = requests.post(
-                url,
-                f"{data} limit {self.pagination_limit};",
-                headers=self.headers,
-                timeout=timeout,
+    @staticmethod
+    def _retry_delay(attempt: int, response: httpx.Response | None = None) -> float:
+        # Honor the delay requested by IGDB when rate limited
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("Retry-After", ""))
+                return min(REQUEST_MAX_RETRY_DELAY, retry_after)
+            except ValueError:
+                pass
+
+        # Exponential backoff with jitter, so concurrent retries don't line up
+        return min(
+            REQUEST_MAX_RETRY_DELAY,
+            REQUEST_RETRY_BASE_DELAY * 2**attempt * (1 + random.uniform(0, 0.5)),
+        )
+
+    def _circuit_open(self) -> bool:
+        if self._consecutive_failures < CIRCUIT_BREAKER_FAIL_THRESHOLD:
+            return False
+
+        if time.time() - self._circuit_opened_at < CIRCUIT_BREAKER_COOLDOWN:
+            return True
+
+        # Half-open: let a single request probe IGDB, the others keep failing fast
+        if self._circuit_probing:
+            return True
+
+        self._circuit_probing = True
+        return False
+
+    def _record_success(self) -> None:
+        self._consecutive_failures = 0
+
+    def _record_failure(self) -> None:
+        self._consecutive_failures += 1
+
+        if self._consecutive_failures >= CIRCUIT_BREAKER_FAIL_THRESHOLD:
+            self._circuit_opened_at = time.time()
+            log.warning(
+                f"IGDB is unreachable, pausing requests for {CIRCUIT_BREAKER_COOLDOWN}s"
             )
-            res.raise_for_status()
-        except (HTTPError, Timeout) as err:
-            # Log the error and return an empty list if the request fails again
-            log.error(err)
+
+    def _get_requests_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to an event loop, and rq jobs each run in a new one
+        loop = asyncio.get_running_loop()
+        if (
+            self._requests_semaphore is None
+            or self._requests_semaphore_loop is not loop
+        ):
+            self._requests_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+            self._requests_semaphore_loop = loop
+
+        return self._requests_semaphore
+
+    @cache_request
+    async def _request(self, url: str, data: str, timeout: int = 120) -> list:
+        if self._circuit_open():
             return []
 
-        return res.json()
+        httpx_client = ctx_httpx_client.get()
+        body = data.encode() + self._limit_suffix
+        token_refreshed = False
+        attempt = 0
+
+        # The half-open probe must be released however the request ends
+        probing = self._circuit_probing
+        try:
+            while True:
+                try:
+                    async with self._get_requests_semaphore():
+                        res = await httpx_client.post(
+                            url,
+                            content=body,
+                            headers=self.headers,
+                            timeout=timeout,
+                        )
+
+                    res.raise_for_status()
+                    self._record_success()
+                    return orjson.loads(res.content)
+                except httpx.NetworkError:
+                    self._record_failure()
+                    log.critical(
+                        "Connection error: can't connect to IGDB", exc_info=True
+                    )
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="Can't connect to IGDB, check your internet connection",
+                    )
+                except httpx.HTTPStatusError as err:
+                    # Attempt to force a token refresh once if the token is invalid,
+                    # retrying right away doesn't count as an attempt
+                    if err.response.status_code == 401 and not token_refreshed:
+                        token = await self.twitch_auth.refresh_oauth_token(
+                            self._applied_token
+                        )
+                        self.headers["Authorization"] = f"Bearer {token}"
+                        self._applied_token = token
+                        token_refreshed = True
+                        continue
+
+                    attempt += 1
+
+                    # Other client errors won't succeed on retry
+                    if err.response.status_code not in RETRYABLE_STATUS_CODES:
+                        # IGDB is up, the request itself is wrong
+                        self._record_success()
+                        log.error(err)
+                        return []  # All requests to the IGDB API return a list
+
+                    if attempt >= REQUEST_MAX_ATTEMPTS:
+                        self._record_failure()
+                        log.error(err)
+                        return []
+
+                    delay = self._retry_delay(attempt - 1, err.response)
+                except httpx.TimeoutException as err:
+                    attempt += 1
+                    if attempt >= REQUEST_MAX_ATTEMPTS:
+                        self._record_failure()
+                        log.error(err)
+                        return []
+
+                    delay = self._retry_delay(attempt - 1)
+
+                log.warning(f"IGDB request failed, retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+        finally:
+            if probing:
+                self._circuit_probing = False
 
     @staticmethod
     def _normalize_search_term(search_term: str) -> str:
-        return (
-            search_term.replace("\u2122", "")  # Remove trademark symbol
-            .replace("\u00ae", "")  # Remove registered symbol
-            .replace("\u00a9", "")  # Remove copywrite symbol
-            .replace("\u2120", "")  # Remove service mark symbol
-            .strip()  # Remove leading and trailing spaces
-        )
+        return search_term.translate(SEARCH_TERM_SYMBOLS_TABLE).strip()
 
     @staticmethod
-    def _normalize_cover_url(url: str) -> str:
-        return f"https:{url.replace('https:', '')}" if url != "" else ""
+    def _normalize_cover_url(url: str, size: str = "") -> str:
+        """Returns the absolute https url, swapping the thumbnail for <size> if given"""
+        if url == "":
+            return ""
+
+        if size:
+            url = url.replace("t_thumb", size)
 
-    def _search_rom(
-        self, search_term: str, platform_idgb_id: int, category: int = 0
+        return f"https:{url.removeprefix('https:')}"
+
+    async def _search_rom(
+        self, search_term: str, platform_idgb_id: int, category: int | None = None
     ) -> dict:
         search_term = uc(search_term)
-        category_filter: str = f"& category={category}" if category else ""
-        roms = self._request(
-            self.games_endpoint,
-            data=f'search "{search_term}"; fields {",".join(self.games_fields)}; where platforms=[{platform_idgb_id}] {category_filter};',
+        # The main game category is 0, only None searches every category
+        category_filter: str = f"& category={category}" if category is not None else ""
+        # Fire the alternative names search speculatively, saves a round-trip on misses
+        roms, alternative_roms = await asyncio.gather(
+            self._request(
+                self.games_endpoint,
+                data=f'search "{search_term}"; fields {self._games_fields_str}; where platforms=[{platform_idgb_id}] {category_filter};',
+                ttl=SEARCH_CACHE_TTL,
+            ),
+            self._request(
+                self.search_endpoint,
+                data=f'fields {self._search_fields_str}; where game.platforms=[{platform_idgb_id}] & (name ~ *"{search_term}"* | alternative_name ~ *"{search_term}"*);',
+                ttl=SEARCH_CACHE_TTL,
+            ),
         )
 
-        if not roms:
-            roms = self._request(
-                self.search_endpoint,
-                data=f'fields {",".join(self.search_fields)}; where game.platforms=[{platform_idgb_id}] & (name ~ *"{search_term}"* | alternative_name ~ *"{search_term}"*);',
+        if not roms and alternative_roms:
+            roms = await self._request(
+                self.games_endpoint,
+                f'fields {self._games_fields_str}; where id={alternative_roms[0]["game"]["id"]};',
+                ttl=GAME_CACHE_TTL,
             )
-            if roms:
-                roms = self._request(
-                    self.games_endpoint,
-                    f'fields {",".join(self.games_fields)}; where id={roms[0]["game"]["id"]};',
-                )
 
+        search_term_lower = search_term.lower()
         exact_matches = [
             rom
             for rom in roms
-            if rom["name"].lower() == search_term.lower()
-            or rom["slug"].lower() == search_term.lower()
+            if rom["name"].lower() == search_term_lower
+            or rom["slug"].lower() == search_term_lower
         ]
 
-        return pydash.get(exact_matches or roms, "[0]", {})
+        return next(iter(exact_matches or roms), {})
 
     async def _ps2_opl_format(self, match: re.Match[str], search_term: str) -> str:
         serial_code = match.group(1)
 
-        with open(PS2_OPL_INDEX_FILE, "r") as index_json:
-            opl_index = json.loads(index_json.read())
-            index_entry = opl_index.get(serial_code, None)
-            if index_entry:
-                search_term = index_entry["Name"]  # type: ignore
+        index_entry = _load_ps2_opl_index().get(serial_code, None)
+        if index_entry:
+            search_term = index_entry["Name"]  # type: ignore
 
         return search_term
 
@@ -275,14 +501,12 @@ class IGDBHandler:
         title_id = match.group(1)
 
         try:
-            with open(SWITCH_TITLEDB_INDEX_FILE, "r") as index_json:
-                titledb_index = json.loads(index_json.read())
+            titledb_index = _load_switch_titledb_index()
         except FileNotFoundError:
             log.warning("Fetching the Switch titleDB index file...")
             await update_switch_titledb_task.run(force=True)
             try:
-                with open(SWITCH_TITLEDB_INDEX_FILE, "r") as index_json:
-                    titledb_index = json.loads(index_json.read())
+                titledb_index = _load_switch_titledb_index()
             except FileNotFoundError:
                 log.error("Could not fetch the Switch titleDB index file")
         finally:
@@ -304,14 +528,12 @@ class IGDBHandler:
         product_id = "".join(product_id)
 
         try:
-            with open(SWITCH_PRODUCT_ID_FILE, "r") as index_json:
-                product_id_index = json.loads(index_json.read())
+            product_id_index = _load_switch_product_id_index()
         except FileNotFoundError:
             log.warning("Fetching the Switch titleDB index file...")
             await update_switch_titledb_task.run(force=True)
             try:
-                with open(SWITCH_PRODUCT_ID_FILE, "r") as index_json:
-                    product_id_index = json.loads(index_json.read())
+                product_id_index = _load_switch_product_id_index()
             except FileNotFoundError:
                 log.error("Could not fetch the Switch titleDB index file")
         finally:
@@ -323,48 +545,41 @@ class IGDBHandler:
     async def _mame_format(self, search_term: str) -> str:
         from handler import fs_rom_handler
 
-        mame_index = {"menu": {"game": []}}
+        mame_index = {}
 
         try:
-            with open(MAME_XML_FILE, "r") as index_xml:
-                mame_index = xmltodict.parse(index_xml.read())
+            mame_index = _load_mame_index()
         except FileNotFoundError:
             log.warning("Fetching the MAME XML file from Github...")
             await update_mame_xml_task.run(force=True)
             try:
-                with open(MAME_XML_FILE, "r") as index_xml:
-                    mame_index = xmltodict.parse(index_xml.read())
+                mame_index = _load_mame_index()
             except FileNotFoundError:
                 log.error("Could not fetch the MAME XML file from Github")
         finally:
-            index_entry = [
-                game
-                for game in mame_index["menu"]["game"]
-                if game["@name"] == search_term
-            ]
+            index_entry = mame_index.get(search_term, None)
             if index_entry:
                 search_term = fs_rom_handler.get_file_name_with_no_tags(
-                    index_entry[0].get("description", search_term)
+                    index_entry.get("description", search_term)
                 )
 
         return search_term
 
-    @check_twitch_token
-    def get_platform(self, slug: str) -> IGDBPlatform:
-        platforms = self._request(
+    async def _get_platform(self, slug: str) -> IGDBPlatform:
+        platforms = await self._request(
             self.platform_endpoint,
-            data=f'fields {",".join(self.platforms_fields)}; where slug="{slug.lower()}";',
+            data=f'fields {self._platforms_fields_str}; where slug="{slug.lower()}";',
         )
 
-        platform = pydash.get(platforms, "[0]", None)
+        platform = platforms[0] if platforms else None
 
         # Check if platform is a version if not found
         if not platform:
-            platform_versions = self._request(
+            platform_versions = await self._request(
                 self.platform_version_endpoint,
-                data=f'fields {",".join(self.platforms_fields)}; where slug="{slug.lower()}";',
+                data=f'fields {self._platforms_fields_str}; where slug="{slug.lower()}";',
             )
-            version = pydash.get(platform_versions, "[0]", None)
+            version = platform_versions[0] if platform_versions else None
             if not version:
                 return IGDBPlatform(igdb_id=None, name=slug.replace("-", " ").title())
 
@@ -379,171 +594,254 @@ class IGDBHandler:
         )
 
     @check_twitch_token
-    async def get_rom(self, file_name: str, platform_idgb_id: int) -> IGDBRom:
+    async def get_platform(self, slug: str) -> IGDBPlatform:
+        platform = self._platforms_cache.get(slug, None)
+        if platform:
+            return IGDBPlatform(**platform)
+
+        # Shared with the other processes (web server, workers) and across restarts
+        cache_key = f"romm:igdb_platform:{slug}"
+        cached = cache.get(cache_key)  # type: ignore[attr-defined]
+        if cached:
+            platform = orjson.loads(cached)
+            self._platforms_cache[slug] = platform
+            return IGDBPlatform(**platform)
+
+        platform = await self._get_platform(slug)
+
+        # Platforms don't change at runtime, but a miss may come from a failed request
+        if platform["igdb_id"]:
+            self._platforms_cache[slug] = platform
+            cache.set(cache_key, orjson.dumps(platform).decode(), ex=PLATFORM_CACHE_TTL)  # type: ignore[attr-defined]
+
+        return IGDBPlatform(**platform)
+
+    async def _get_search_term(self, file_name: str, platform_idgb_id: int) -> str:
         from handler import fs_rom_handler
 
         search_term = fs_rom_handler.get_file_name_with_no_tags(file_name)
 
+        # Check the platform first so other platforms skip the filename patterns
         # Support for PS2 OPL filename format
-        match = re.match(PS2_OPL_REGEX, file_name)
-        if platform_idgb_id == PS2_IGDB_ID and match:
+        if platform_idgb_id == PS2_IGDB_ID and (
+            match := PS2_OPL_PATTERN.match(file_name)
+        ):
             search_term = await self._ps2_opl_format(match, search_term)
 
         # Support for switch titleID filename format
-        match = re.search(SWITCH_TITLEDB_REGEX, file_name)
-        if platform_idgb_id == SWITCH_IGDB_ID and match:
+        if platform_idgb_id == SWITCH_IGDB_ID and (
+            match := SWITCH_TITLEDB_PATTERN.search(file_name)
+        ):
             search_term = await self._switch_titledb_format(match, search_term)
 
         # Support for switch productID filename format
-        match = re.search(SWITCH_PRODUCT_ID_REGEX, file_name)
-        if platform_idgb_id == SWITCH_IGDB_ID and match:
+        if platform_idgb_id == SWITCH_IGDB_ID and (
+            match := SWITCH_PRODUCT_ID_PATTERN.search(file_name)
+        ):
             search_term = await self._switch_productid_format(match, search_term)
 
         # Support for MAME arcade filename format
         if platform_idgb_id in ARCADE_IGDB_IDS:
             search_term = await self._mame_format(search_term)
 
-        search_term = self._normalize_search_term(search_term)
-
-        rom = (
-            self._search_rom(search_term, platform_idgb_id, MAIN_GAME_CATEGORY)
-            or self._search_rom(search_term, platform_idgb_id, EXPANDED_GAME_CATEGORY)
-            or self._search_rom(search_term, platform_idgb_id)
-        )
+        return self._normalize_search_term(search_term)
 
+    def _build_rom(self, rom: dict, search_term: str, cover_size: str = "") -> IGDBRom:
         return IGDBRom(
             igdb_id=rom.get("id", None),
             name=rom.get("name", search_term),
             slug=rom.get("slug", ""),
             summary=rom.get("summary", ""),
-            url_cover=self._normalize_cover_url(rom.get("cover", {}).get("url", "")),
+            url_cover=self._normalize_cover_url(
+                rom.get("cover", {}).get("url", ""), size=cover_size
+            ),
             url_screenshots=[
-                self._normalize_cover_url(s.get("url", "")).replace(
-                    "t_thumb", "t_original"
-                )
+                self._normalize_cover_url(s.get("url", ""), size="t_original")
                 for s in rom.get("screenshots", [])
             ],
             igdb_metadata=extract_metadata_from_igdb_rom(rom),
         )
 
     @check_twitch_token
-    def get_rom_by_id(self, igdb_id: int) -> IGDBRom:
-        roms = self._request(
-            self.games_endpoint,
-            f'fields {",".join(self.games_fields)}; where id={igdb_id};',
+    async def get_rom(self, file_name: str, platform_idgb_id: int) -> IGDBRom:
+        search_term = await self._get_search_term(file_name, platform_idgb_id)
+
+        # Search every category at once, then keep the first match by priority
+        roms = await asyncio.gather(
+            self._search_rom(search_term, platform_idgb_id, MAIN_GAME_CATEGORY),
+            self._search_rom(search_term, platform_idgb_id, EXPANDED_GAME_CATEGORY),
+            self._search_rom(search_term, platform_idgb_id),
         )
-        rom = pydash.get(roms, "[0]", {})
+        rom = next((rom for rom in roms if rom), {})
 
-        return IGDBRom(
-            igdb_id=igdb_id,
-            name=rom.get("name", ""),
-            slug=rom.get("slug", ""),
-            summary=rom.get("summary", ""),
-            url_cover=self._normalize_cover_url(rom.get("cover", {}).get("url", "")),
-            url_screenshots=[
-                self._normalize_cover_url(s.get("url", "")).replace(
-                    "t_thumb", "t_original"
-                )
-                for s in rom.get("screenshots", [])
-            ],
-            igdb_metadata=extract_metadata_from_igdb_rom(rom),
+        return self._build_rom(rom, search_term)
+
+    @check_twitch_token
+    async def get_roms_batch(
+        self, file_names: list[str], platform_idgb_id: int
+    ) -> dict[str, IGDBRom]:
+        """Look up many roms of a platform with a few exact name queries
+
+        Args:
+            file_names: file names of the roms to look up
+            platform_idgb_id: IGDB id of the platform the roms belong to
+        Returns
+            Dict of file name to IGDB rom, only for the roms whose name exactly matched
+            a main game. The others still need a regular (fuzzy) get_rom search, which
+            prefers main games even over an exact match in another category.
+        """
+        if not platform_idgb_id or not file_names:
+            return {}
+
+        # Sequential, a missing index file would otherwise be fetched once per rom
+        search_terms = [
+            uc(await self._get_search_term(file_name, platform_idgb_id))
+            for file_name in file_names
+        ]
+
+        # Names that would break the query string are left to get_rom
+        names = list(
+            dict.fromkeys(term for term in search_terms if term and '"' not in term)
+        )
+
+        matches: dict[str, dict] = {}
+
+        # Leave room in each page for names matching more than one game, and send
+        # the batches one at a time, IGDB only allows a few requests per second
+        batch_size = self.pagination_limit // 2
+        for i in range(0, len(names), batch_size):
+            names_filter = ",".join(f'"{name}"' for name in names[i : i + batch_size])
+            roms = await self._request(
+                self.games_endpoint,
+                f"fields {self._games_fields_str},category; where platforms=[{platform_idgb_id}] & name=({names_filter});",
+                ttl=GAME_CACHE_TTL,
+            )
+            for rom in roms:
+                # Exact matches in other categories are left to get_rom, which
+                # would pick a main game with a close name first
+                if rom.get("category", MAIN_GAME_CATEGORY) == MAIN_GAME_CATEGORY:
+                    matches.setdefault(rom["name"].lower(), rom)
+
+        return {
+            file_name: self._build_rom(matches[search_term.lower()], search_term)
+            for file_name, search_term in zip(file_names, search_terms)
+            if search_term.lower() in matches
+        }
+
+    @check_twitch_token
+    async def get_rom_by_id(self, igdb_id: int) -> IGDBRom:
+        roms = await self._request(
+            self.games_endpoint,
+            f'fields {self._games_fields_str}; where id={igdb_id};',
+            ttl=GAME_CACHE_TTL,
         )
+        # Keep the requested id on a miss, callers store it as is
+        return self._build_rom(roms[0] if roms else {"id": igdb_id}, "")
 
     @check_twitch_token
-    def get_matched_roms_by_id(self, igdb_id: int) -> list[IGDBRom]:
-        matched_rom = self.get_rom_by_id(igdb_id)
+    async def get_matched_roms_by_id(self, igdb_id: int) -> list[IGDBRom]:
+        matched_rom = await self.get_rom_by_id(igdb_id)
         matched_rom.update(
-            url_cover=matched_rom.get("url_cover", "").replace(
-                "t_thumb", "t_cover_big"
+            url_cover=self._normalize_cover_url(
+                matched_rom.get("url_cover", ""), size="t_cover_big"
             ),
         )
         return [matched_rom]
 
     @check_twitch_token
-    def get_matched_roms_by_name(
+    async def get_matched_roms_by_name(
         self, search_term: str, platform_idgb_id: int, search_extended: bool = False
     ) -> list[IGDBRom]:
         if not platform_idgb_id:
             return []
 
         search_term = uc(search_term)
-        matched_roms = self._request(
-            self.games_endpoint,
-            data=f'search "{search_term}"; fields {",".join(self.games_fields)}; where platforms=[{platform_idgb_id}];',
-        )
+        games_data = f'search "{search_term}"; fields {self._games_fields_str}; where platforms=[{platform_idgb_id}];'
+        search_data = f'fields {self._search_fields_str}; where game.platforms=[{platform_idgb_id}] & (name ~ *"{search_term}"* | alternative_name ~ *"{search_term}"*);'
 
-        if not matched_roms or search_extended:
+        alternative_matched_roms: list[dict] = []
+        if search_extended:
+            # Both queries are independent when searching extended, run them concurrently
             log.info("Extended searching...")
-            alternative_matched_roms = self._request(
-                self.search_endpoint,
-                data=f'fields {",".join(self.search_fields)}; where game.platforms=[{platform_idgb_id}] & (name ~ *"{search_term}"* | alternative_name ~ *"{search_term}"*);',
+            matched_roms, alternative_matched_roms = await asyncio.gather(
+                self._request(
+                    self.games_endpoint, data=games_data, ttl=SEARCH_CACHE_TTL
+                ),
+                self._request(
+                    self.search_endpoint, data=search_data, ttl=SEARCH_CACHE_TTL
+                ),
+            )
+        else:
+            matched_roms = await self._request(
+                self.games_endpoint, data=games_data, ttl=SEARCH_CACHE_TTL
             )
+            if not matched_roms:
+                log.info("Extended searching...")
+                alternative_matched_roms = await self._request(
+                    self.search_endpoint, data=search_data, ttl=SEARCH_CACHE_TTL
+                )
 
-            if alternative_matched_roms:
-                alternative_roms_ids = []
-                for rom in alternative_matched_roms:
-                    alternative_roms_ids.append(
-                        rom.get("game").get("id", "")
-                        if "game" in rom.keys()
-                        else rom.get("id", "")
-                    )
-                id_filter = " | ".join(
-                    list(
-                        map(
-                            lambda rom: (
-                                f'id={rom.get("game").get("id", "")}'
-                                if "game" in rom.keys()
-                                else f'id={rom.get("id", "")}'
-                            ),
-                            alternative_matched_roms,
-                        )
+        if alternative_matched_roms:
+            alternative_roms_ids = [
+                str((rom.get("game") or rom)["id"]) for rom in alternative_matched_roms
+            ]
+
+            # Fetch the games in batches of at most one page each
+            id_batches = [
+                alternative_roms_ids[i : i + self.pagination_limit]
+                for i in range(0, len(alternative_roms_ids), self.pagination_limit)
+            ]
+            for alternative_roms in await asyncio.gather(
+                *(
+                    self._request(
+                        self.games_endpoint,
+                        f'fields {self._games_fields_str}; where id=({",".join(ids)});',
+                        ttl=GAME_CACHE_TTL,
                     )
+                    for ids in id_batches
                 )
-                alternative_matched_roms = self._request(
-                    self.games_endpoint,
-                    f'fields {",".join(self.games_fields)}; where {id_filter};',
-                )
-                matched_roms.extend(alternative_matched_roms)
-
-        # Use a dictionary to keep track of unique ids
-        unique_ids = {}
+            ):
+                matched_roms.extend(alternative_roms)
 
-        # Use a list comprehension to filter duplicates based on the 'id' key
-        matched_roms = [
-            unique_ids.setdefault(rom["id"], rom)
-            for rom in matched_roms
-            if rom["id"] not in unique_ids
-        ]
+        # Filter duplicates based on the 'id' key
+        matched_roms = list({rom["id"]: rom for rom in matched_roms}.values())
 
         return [
-            IGDBRom(
-                igdb_id=rom.get("id"),
-                name=rom.get("name", search_term),
-                slug=rom.get("slug", ""),
-                summary=rom.get("summary", ""),
-                url_cover=self._normalize_cover_url(
-                    rom.get("cover", {})
-                    .get("url", "")
-                    .replace("t_thumb", "t_cover_big")
-                ),
-                url_screenshots=[
-                    self._normalize_cover_url(s.get("url", "")).replace(
-                        "t_thumb", "t_original"
-                    )
-                    for s in rom.get("screenshots", [])
-                ],
-                igdb_metadata=extract_metadata_from_igdb_rom(rom),
-            )
+            self._build_rom(rom, search_term, cover_size="t_cover_big")
             for rom in matched_roms
         ]
 
 
 class TwitchAuth:
-    def _update_twitch_token(self) -> str:
+    def __init__(self) -> None:
+        # In-process copy of the token, avoids hitting redis on every request
+        self._token: str = ""
+        self._token_expires_at: float = 0.0
+        self._refresh_lock: asyncio.Lock | None = None
+        self._refresh_lock_loop: asyncio.AbstractEventLoop | None = None
+
+    def _has_fresh_token(self) -> bool:
+        # Near expiry, go back to redis in case another process already refreshed it
+        return bool(self._token) and (
+            time.time() < self._token_expires_at - TWITCH_TOKEN_EXPIRY_MARGIN
+        )
+
+    def _get_refresh_lock(self) -> asyncio.Lock:
+        # Locks are bound to an event loop, and rq jobs each run in a new one
+        loop = asyncio.get_running_loop()
+        if self._refresh_lock is None or self._refresh_lock_loop is not loop:
+            self._refresh_lock = asyncio.Lock()
+            self._refresh_lock_loop = loop
+
+        return self._refresh_lock
+
+    async def _update_twitch_token(self) -> str:
         token = ""
         expires_in = 0
+        httpx_client = ctx_httpx_client.get()
+
         try:
-            res = requests.post(
+            res = await httpx_client.post(
                 url="https://id.twitch.tv/oauth2/token",
                 params={
                     "client_id": IGDB_CLIENT_ID,
@@ -557,9 +855,10 @@ class TwitchAuth:
                 log.critical("IGDB Error: Invalid IGDB_CLIENT_ID or IGDB_CLIENT_SECRET")
                 return token
             else:
-                token = res.json().get("access_token", "")
-                expires_in = res.json().get("expires_in", 0)
-        except requests.exceptions.ConnectionError:
+                res_json = orjson.loads(res.content)
+                token = res_json.get("access_token", "")
+                expires_in = res_json.get("expires_in", 0)
+        except httpx.NetworkError:
             log.critical("Can't connect to IGDB, check your internet connection.")
             return token
 
@@ -567,27 +866,54 @@ class TwitchAuth:
             return token
 
         # Set token in redis to expire in <expires_in> seconds
+        token_expires_at = time.time() + expires_in - 10
         cache.set("romm:twitch_token", token, ex=expires_in - 10)  # type: ignore[attr-defined]
-        cache.set("romm:twitch_token_expires_at", time.time() + expires_in - 10)  # type: ignore[attr-defined]
+        cache.set("romm:twitch_token_expires_at", token_expires_at)  # type: ignore[attr-defined]
+
+        self._token = token
+        self._token_expires_at = token_expires_at
 
         log.info("Twitch token fetched!")
 
         return token
 
-    def get_oauth_token(self) -> str:
+    async def get_oauth_token(self) -> str:
         # Use a fake token when running tests
         if "pytest" in sys.modules:
             return "test_token"
 
-        # Fetch the token cache
-        token = cache.get("romm:twitch_token")  # type: ignore[attr-defined]
-        token_expires_at = cache.get("romm:twitch_token_expires_at")  # type: ignore[attr-defined]
+        if self._has_fresh_token():
+            return self._token
 
-        if not token or time.time() > float(token_expires_at or 0):
-            log.warning("Twitch token invalid: fetching a new one...")
-            return self._update_twitch_token()
+        # Only one task fetches a new token, the others wait for it
+        async with self._get_refresh_lock():
+            if self._has_fresh_token():
+                return self._token
 
-        return token
+            # Fetch the token cache
+            token = cache.get("romm:twitch_token")  # type: ignore[attr-defined]
+            token_expires_at = float(cache.get("romm:twitch_token_expires_at") or 0)  # type: ignore[attr-defined]
+
+            if not token or time.time() > token_expires_at:
+                log.warning("Twitch token invalid: fetching a new one...")
+                return await self._update_twitch_token()
+
+            self._token = token
+            self._token_expires_at = token_expires_at
+
+            return token
+
+    async def refresh_oauth_token(self, invalid_token: str) -> str:
+        """Force a new token when IGDB rejected <invalid_token>
+
+        Concurrent callers that got rejected with the same token share a single refresh.
+        """
+        async with self._get_refresh_lock():
+            if self._token and self._token != invalid_token:
+                return self._token
+
+            log.warning("Twitch token invalid: fetching a new one...")
+            return await self._update_twitch_token()
 
 
 GAMES_FIELDS = [
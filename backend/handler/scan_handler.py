@@ -1,4 +1,7 @@
-from typing import Any
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Final
 
 import emoji
 from config.config_manager import config_manager as cm
@@ -9,25 +12,81 @@ from handler import (
     fs_rom_handler,
     igdb_handler,
 )
+from handler.igdb_handler import IGDBMetadata, IGDBRom
 from logger.logger import log
 from models.assets import Save, Screenshot, State
 from models.platform import Platform
 from models.rom import Rom
 from models.user import User
 
-
-def _get_main_platform_igdb_id(platform: Platform):
+# Emojized once, the tokens never change
+VIDEO_GAME_EMOJI: Final = emoji.emojize(":video_game:")
+CROSS_MARK_EMOJI: Final = emoji.emojize(":cross_mark:")
+ALIEN_MONSTER_EMOJI: Final = emoji.emojize(":alien_monster:")
+
+RESOURCE_ATTRS: Final = ("path_cover_s", "path_cover_l", "path_screenshots")
+
+
+@dataclass(slots=True)
+class RomScanCtx:
+    """Attributes of a rom gathered while scanning it, in place of a kwargs dict"""
+
+    # Platforms scanned on their own aren't saved yet
+    platform_id: int | None
+    file_name: str
+    file_name_no_tags: str
+    file_name_no_ext: str
+    file_extension: str
+    file_path: str
+    file_size_bytes: int
+    regions: list[str]
+    revision: str
+    languages: list[str]
+    tags: list[str]
+    multi: bool = False
+    files: list[str] = field(default_factory=list)
+    igdb_id: int | None = None
+    name: str | None = None
+    slug: str | None = None
+    summary: str | None = None
+    igdb_metadata: IGDBMetadata | None = None
+    url_cover: str = ""
+    url_screenshots: list[str] = field(default_factory=list)
+    # Only set once downloaded, roms not found in IGDB keep their stored resources
+    path_cover_s: str | None = None
+    path_cover_l: str | None = None
+    path_screenshots: list[str] | None = None
+
+    def set_igdb_rom(self, igdb_rom: IGDBRom) -> None:
+        self.igdb_id = igdb_rom["igdb_id"]
+        self.name = igdb_rom["name"]
+        self.slug = igdb_rom["slug"]
+        self.summary = igdb_rom["summary"]
+        self.igdb_metadata = igdb_rom["igdb_metadata"]
+        self.url_cover = igdb_rom["url_cover"]
+        self.url_screenshots = igdb_rom["url_screenshots"]
+
+    def to_rom(self) -> Rom:
+        attrs = {attr: getattr(self, attr) for attr in self.__slots__}
+        for attr in RESOURCE_ATTRS:
+            if attrs[attr] is None:
+                del attrs[attr]
+
+        return Rom(**attrs)
+
+
+async def get_main_platform_igdb_id(platform: Platform) -> int:
     cnfg = cm.get_config()
 
-    if platform.fs_slug in cnfg.PLATFORMS_VERSIONS.keys():
+    if platform.fs_slug in cnfg.PLATFORMS_VERSIONS:
         main_platform_slug = cnfg.PLATFORMS_VERSIONS[platform.fs_slug]
         main_platform = db_platform_handler.get_platform_by_fs_slug(main_platform_slug)
         if main_platform:
             main_platform_igdb_id = main_platform.igdb_id
         else:
-            main_platform_igdb_id = igdb_handler.get_platform(main_platform_slug)[
-                "igdb_id"
-            ]
+            main_platform_igdb_id = (
+                await igdb_handler.get_platform(main_platform_slug)
+            )["igdb_id"]
             if not main_platform_igdb_id:
                 main_platform_igdb_id = platform.igdb_id
     else:
@@ -35,48 +94,66 @@ def _get_main_platform_igdb_id(platform: Platform):
     return main_platform_igdb_id
 
 
-def scan_platform(fs_slug: str, fs_platforms) -> Platform:
+async def scan_platform(
+    fs_slug: str,
+    fs_platforms,
+    db_platform: Platform | None = None,
+    complete_rescan: bool = False,
+) -> Platform:
     """Get platform details
 
     Args:
         fs_slug: short name of the platform
+        db_platform: platform stored for fs_slug by a previous scan, if any
+        complete_rescan: look the platform up in IGDB even if already identified
     Returns
         Platform object
     """
 
-    log.info(f"· {fs_slug}")
+    log.info("· %s", fs_slug)
 
     platform_attrs: dict[str, Any] = {}
     platform_attrs["fs_slug"] = fs_slug
 
     cnfg = cm.get_config()
-    swapped_platform_bindings = dict((v, k) for k, v in cnfg.PLATFORMS_BINDING.items())
 
     # Sometimes users change the name of the folder, so we try to match it with the config
     if fs_slug not in fs_platforms:
         log.warning(
-            f"  {fs_slug} not found in file system, trying to match via config..."
+            "  %s not found in file system, trying to match via config...", fs_slug
         )
-        if fs_slug in swapped_platform_bindings.keys():
-            platform = db_platform_handler.get_platform_by_fs_slug(fs_slug)
-            if platform:
-                platform_attrs["fs_slug"] = swapped_platform_bindings[platform.slug]
+        # Only needed for renamed folders, don't build it for every platform
+        swapped_platform_bindings = {v: k for k, v in cnfg.PLATFORMS_BINDING.items()}
+        if fs_slug in swapped_platform_bindings and db_platform:
+            platform_attrs["fs_slug"] = swapped_platform_bindings[db_platform.slug]
 
     try:
-        if fs_slug in cnfg.PLATFORMS_BINDING.keys():
+        if fs_slug in cnfg.PLATFORMS_BINDING:
             platform_attrs["slug"] = cnfg.PLATFORMS_BINDING[fs_slug]
         else:
             platform_attrs["slug"] = fs_slug
     except (KeyError, TypeError, AttributeError):
         platform_attrs["slug"] = fs_slug
 
-    platform = igdb_handler.get_platform(platform_attrs["slug"])
+    # Already identified by a previous scan, the IGDB id of a slug never changes
+    if (
+        not complete_rescan
+        and db_platform
+        and db_platform.igdb_id
+        and db_platform.slug == platform_attrs["slug"]
+    ):
+        log.info("  Identified as %s %s", db_platform.name, VIDEO_GAME_EMOJI)
+        return Platform(
+            **platform_attrs, igdb_id=db_platform.igdb_id, name=db_platform.name
+        )
+
+    platform = await igdb_handler.get_platform(platform_attrs["slug"])
 
     if platform["igdb_id"]:
-        log.info(emoji.emojize(f"  Identified as {platform['name']} :video_game:"))
+        log.info("  Identified as %s %s", platform["name"], VIDEO_GAME_EMOJI)
     else:
         log.warning(
-            emoji.emojize(f"  {platform_attrs['slug']} not found in IGDB :cross_mark:")
+            "  %s not found in IGDB %s", platform_attrs["slug"], CROSS_MARK_EMOJI
         )
 
     platform_attrs.update(platform)
@@ -89,101 +166,112 @@ async def scan_rom(
     rom_attrs: dict,
     r_igbd_id_search: str = "",
     overwrite: bool = False,
+    igdb_handler_rom: IGDBRom | None = None,
+    main_platform_igdb_id: int | None = None,
+    roms_path: str = "",
 ) -> Rom:
-    roms_path = fs_rom_handler.get_fs_structure(platform.fs_slug)
+    roms_path = roms_path or fs_rom_handler.get_fs_structure(platform.fs_slug)
+    file_name = rom_attrs["file_name"]
 
-    log.info(f"\t · {r_igbd_id_search or rom_attrs['file_name']}")
+    log.info("\t · %s", r_igbd_id_search or file_name)
 
-    if rom_attrs.get("multi", False):
+    if rom_attrs.get("multi", False) and log.isEnabledFor(logging.INFO):
         for file in rom_attrs["files"]:
-            log.info(f"\t\t · {file}")
+            log.info("\t\t · %s", file)
 
     # Update properties that don't require IGDB
-    file_size = fs_rom_handler.get_rom_file_size(
+    (
+        file_name_no_tags,
+        file_name_no_ext,
+        file_extension,
+        regions,
+        revision,
+        languages,
+        tags,
+    ) = fs_rom_handler.parse_all(file_name)
+    ctx = RomScanCtx(
+        platform_id=platform.id,  # type: ignore[arg-type]
+        file_name=file_name,
+        file_name_no_tags=file_name_no_tags,
+        file_name_no_ext=file_name_no_ext,
+        file_extension=file_extension,
+        file_path=roms_path,
+        file_size_bytes=fs_rom_handler.get_rom_file_size(
+            multi=rom_attrs["multi"],
+            file_name=file_name,
+            multi_files=rom_attrs["files"],
+            roms_path=roms_path,
+        ),
+        regions=regions,
+        revision=revision,
+        languages=languages,
+        tags=tags,
         multi=rom_attrs["multi"],
-        file_name=rom_attrs["file_name"],
-        multi_files=rom_attrs["files"],
-        roms_path=roms_path,
+        files=rom_attrs["files"],
     )
-    regs, rev, langs, other_tags = fs_rom_handler.parse_tags(rom_attrs["file_name"])
-    rom_attrs.update(
-        {
-            "platform_id": platform.id,
-            "file_path": roms_path,
-            "file_name": rom_attrs["file_name"],
-            "file_name_no_tags": fs_rom_handler.get_file_name_with_no_tags(
-                rom_attrs["file_name"]
-            ),
-            "file_name_no_ext": fs_rom_handler.get_file_name_with_no_extension(
-                rom_attrs["file_name"]
-            ),
-            "file_extension": fs_rom_handler.parse_file_extension(
-                rom_attrs["file_name"]
-            ),
-            "file_size_bytes": file_size,
-            "multi": rom_attrs["multi"],
-            "regions": regs,
-            "revision": rev,
-            "languages": langs,
-            "tags": other_tags,
-        }
-    )
-
-    main_platform_igdb_id = _get_main_platform_igdb_id(platform)
 
-    # Search in IGDB
-    igdb_handler_rom = (
-        igdb_handler.get_rom_by_id(int(r_igbd_id_search))
-        if r_igbd_id_search
-        else await igdb_handler.get_rom(rom_attrs["file_name"], main_platform_igdb_id)
-    )
+    # Search in IGDB, unless already found by a batched lookup
+    igdb_rom: IGDBRom
+    if r_igbd_id_search:
+        igdb_rom = await igdb_handler.get_rom_by_id(int(r_igbd_id_search))
+    elif igdb_handler_rom is None:
+        # Scanning a whole platform resolves it once for all of its roms
+        if main_platform_igdb_id is None:
+            main_platform_igdb_id = await get_main_platform_igdb_id(platform)
+        igdb_rom = await igdb_handler.get_rom(file_name, main_platform_igdb_id)
+    else:
+        igdb_rom = igdb_handler_rom
 
-    rom_attrs.update(igdb_handler_rom)
+    ctx.set_igdb_rom(igdb_rom)
 
     # Return early if not found in IGDB
-    if not igdb_handler_rom["igdb_id"]:
+    if not ctx.igdb_id:
         log.warning(
-            emoji.emojize(
-                f"\t   {r_igbd_id_search or rom_attrs['file_name']} not found in IGDB :cross_mark:"
-            )
+            "\t   %s not found in IGDB %s",
+            r_igbd_id_search or file_name,
+            CROSS_MARK_EMOJI,
         )
-        return Rom(**rom_attrs)
+        return ctx.to_rom()
 
-    log.info(
-        emoji.emojize(f"\t   Identified as {igdb_handler_rom['name']} :alien_monster:")
-    )
+    # The folder of the cover and screenshots is named after the rom
+    rom_name = ctx.name or file_name_no_tags
+    log.info("\t   Identified as %s %s", rom_name, ALIEN_MONSTER_EMOJI)
 
-    # Update properties from IGDB
-    rom_attrs.update(
+    # Update properties from IGDB, cover and screenshots download concurrently
+    cover, screenshots = await asyncio.gather(
         fs_resource_handler.get_rom_cover(
             overwrite=overwrite,
             platform_fs_slug=platform.slug,
-            rom_name=rom_attrs["name"],
-            url_cover=rom_attrs["url_cover"],
-        )
-    )
-    rom_attrs.update(
+            rom_name=rom_name,
+            url_cover=ctx.url_cover,
+        ),
         fs_resource_handler.get_rom_screenshots(
             platform_fs_slug=platform.slug,
-            rom_name=rom_attrs["name"],
-            url_screenshots=rom_attrs["url_screenshots"],
-        )
+            rom_name=rom_name,
+            url_screenshots=ctx.url_screenshots,
+        ),
     )
+    ctx.path_cover_s = cover["path_cover_s"]
+    ctx.path_cover_l = cover["path_cover_l"]
+    ctx.path_screenshots = screenshots["path_screenshots"]
 
-    return Rom(**rom_attrs)
+    return ctx.to_rom()
 
 
 def _scan_asset(file_name: str, path: str):
-    log.info(f"\t\t · {file_name}")
+    log.info("\t\t · %s", file_name)
 
     file_size = fs_asset_handler.get_asset_size(file_name=file_name, asset_path=path)
+    file_name_no_tags, file_name_no_ext, file_extension = (
+        fs_asset_handler.parse_file_name(file_name)
+    )
 
     return {
         "file_path": path,
         "file_name": file_name,
-        "file_name_no_tags": fs_asset_handler.get_file_name_with_no_tags(file_name),
-        "file_name_no_ext": fs_asset_handler.get_file_name_with_no_extension(file_name),
-        "file_extension": fs_asset_handler.parse_file_extension(file_name),
+        "file_name_no_tags": file_name_no_tags,
+        "file_name_no_ext": file_name_no_ext,
+        "file_extension": file_extension,
         "file_size_bytes": file_size,
     }
 
@@ -1,14 +1,21 @@
+import base64
+from unittest.mock import AsyncMock, patch
+
+import httpx
 import pytest
 
 from handler.scan_handler import scan_platform, scan_rom
 from exceptions.fs_exceptions import RomsNotFoundException
+from handler.igdb_handler import IGDBRom
 from models.platform import Platform
 from models.rom import Rom
+from utils.context import ctx_httpx_client, initialize_context, set_context_var
 
 
 @pytest.mark.vcr
-def test_scan_platform():
-    platform = scan_platform("n64", "n64")
+@initialize_context()
+async def test_scan_platform():
+    platform = await scan_platform("n64", "n64")
 
     assert platform.__class__ == Platform
     assert platform.fs_slug == "n64"
@@ -17,22 +24,90 @@ def test_scan_platform():
     assert platform.igdb_id == 4
 
     try:
-        platform = scan_platform("", "")
+        platform = await scan_platform("", "")
     except RomsNotFoundException as e:
         assert "Roms not found for platform" in str(e)
 
 
-@pytest.mark.vcr
+async def test_scan_platform_reuses_stored_igdb_id():
+    db_platform = Platform(fs_slug="n64", slug="n64", igdb_id=4, name="Nintendo 64")
+
+    with patch(
+        "handler.scan_handler.igdb_handler.get_platform", new_callable=AsyncMock
+    ) as get_platform_mock:
+        platform = await scan_platform("n64", "n64", db_platform)
+
+    assert not get_platform_mock.called
+    assert platform.slug == "n64"
+    assert platform.igdb_id == 4
+    assert platform.name == "Nintendo 64"
+
+
+@pytest.mark.parametrize(
+    "db_platform, complete_rescan",
+    [
+        (Platform(fs_slug="n64", slug="n64", igdb_id=None, name="n64"), False),
+        (Platform(fs_slug="n64", slug="nes", igdb_id=18, name="NES"), False),
+        (Platform(fs_slug="n64", slug="n64", igdb_id=4, name="Nintendo 64"), True),
+    ],
+)
+async def test_scan_platform_searches_igdb(db_platform, complete_rescan):
+    with patch(
+        "handler.scan_handler.igdb_handler.get_platform", new_callable=AsyncMock
+    ) as get_platform_mock:
+        get_platform_mock.return_value = {"igdb_id": 4, "name": "Nintendo 64"}
+        platform = await scan_platform("n64", "n64", db_platform, complete_rescan)
+
+    get_platform_mock.assert_awaited_once_with("n64")
+    assert platform.igdb_id == 4
+    assert platform.name == "Nintendo 64"
+
+
+PAPER_MARIO = {
+    "id": 3340,
+    "name": "Paper Mario",
+    "slug": "paper-mario",
+    "summary": "Mario must rescue the seven Star Spirits from Bowser.",
+    "cover": {"url": "//images.igdb.com/igdb/image/upload/t_thumb/co1qda.png"},
+    "screenshots": [
+        {"url": "//images.igdb.com/igdb/image/upload/t_thumb/sc8dp6.jpg"},
+    ],
+}
+
+
+# 1x1 PNG
+IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+def igdb_api(request: httpx.Request) -> httpx.Response:
+    # Covers and screenshots, any small valid image will do
+    if request.url.host == "images.igdb.com":
+        return httpx.Response(200, content=IMAGE)
+
+    query = request.content.decode()
+    if request.url.path == "/v4/games" and (
+        ('search "Paper Mario"' in query and "category=10" not in query)
+        or "where id=3340" in query
+    ):
+        return httpx.Response(200, json=[PAPER_MARIO])
+
+    return httpx.Response(200, json=[])
+
+
 async def test_scan_rom():
     platform = Platform(fs_slug="n64", igdb_id=4)
-    rom = await scan_rom(
-        platform,
-        {
-            "file_name": "Paper Mario (USA).z64",
-            "multi": False,
-            "files": ["Paper Mario (USA).z64"],
-        },
-    )
+    async with httpx.AsyncClient(transport=httpx.MockTransport(igdb_api)) as client:
+        async with set_context_var(ctx_httpx_client, client):
+            rom = await scan_rom(
+                platform,
+                {
+                    "file_name": "Paper Mario (USA).z64",
+                    "multi": False,
+                    "files": ["Paper Mario (USA).z64"],
+                },
+            )
 
     assert rom.__class__ == Rom
     assert rom.file_name == "Paper Mario (USA).z64"
@@ -42,3 +117,35 @@ async def test_scan_rom():
     assert rom.files == ["Paper Mario (USA).z64"]
     assert rom.tags == []
     assert not rom.multi
+    assert rom.url_cover == (
+        "https://images.igdb.com/igdb/image/upload/t_thumb/co1qda.png"
+    )
+    assert "Paper%20Mario/cover/small.png" in rom.path_cover_s
+    assert len(rom.path_screenshots) == 1
+
+
+async def test_scan_rom_not_found_keeps_resources():
+    platform = Platform(fs_slug="n64", igdb_id=4)
+    rom = await scan_rom(
+        platform,
+        {
+            "file_name": "Paper Mario (USA).z64",
+            "multi": False,
+            "files": ["Paper Mario (USA).z64"],
+        },
+        igdb_handler_rom=IGDBRom(
+            igdb_id=None,
+            name="Paper Mario",
+            slug="",
+            summary="",
+            url_cover="",
+            url_screenshots=[],
+            igdb_metadata=None,
+        ),
+    )
+
+    assert rom.igdb_id is None
+    # Left unset so merging the rom keeps the stored cover and screenshots
+    assert "path_cover_s" not in rom.__dict__
+    assert "path_cover_l" not in rom.__dict__
+    assert "path_screenshots" not in rom.__dict__
@@ -0,0 +1,303 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from handler.igdb_handler import (
+    CIRCUIT_BREAKER_COOLDOWN,
+    CIRCUIT_BREAKER_FAIL_THRESHOLD,
+    EXPANDED_GAME_CATEGORY,
+    MAIN_GAME_CATEGORY,
+    REQUEST_MAX_ATTEMPTS,
+    REQUEST_MAX_RETRY_DELAY,
+    REQUEST_RETRY_BASE_DELAY,
+    RETRYABLE_STATUS_CODES,
+    IGDBHandler,
+)
+from handler.redis_handler import cache
+from utils.context import ctx_httpx_client, set_context_var
+
+GAMES_URL = "https://api.igdb.com/v4/games"
+
+
+def igdb_response(
+    status_code: int, content: bytes = b"[]", headers: dict | None = None
+) -> httpx.Response:
+    return httpx.Response(
+        status_code,
+        content=content,
+        headers=headers,
+        request=httpx.Request("POST", GAMES_URL),
+    )
+
+
+@pytest.fixture
+def igdb():
+    # Responses are cached by request, start every test from an empty cache
+    cache.flushall()
+    return IGDBHandler()
+
+
+@pytest.fixture
+def httpx_client():
+    client = MagicMock()
+    client.post = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def sleep_mock():
+    with patch("handler.igdb_handler.asyncio.sleep", new_callable=AsyncMock) as mock:
+        yield mock
+
+
+def open_circuit(igdb: IGDBHandler, opened_at: float) -> None:
+    igdb._consecutive_failures = CIRCUIT_BREAKER_FAIL_THRESHOLD
+    igdb._circuit_opened_at = opened_at
+
+
+def test_retry_delay_honors_retry_after():
+    response = igdb_response(429, headers={"Retry-After": "2"})
+
+    assert IGDBHandler._retry_delay(0, response) == 2.0
+
+
+def test_retry_delay_caps_retry_after():
+    response = igdb_response(429, headers={"Retry-After": "3600"})
+
+    assert IGDBHandler._retry_delay(0, response) == REQUEST_MAX_RETRY_DELAY
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 2])
+def test_retry_delay_backoff(attempt):
+    # Invalid or missing Retry-After headers fall back to the exponential backoff
+    response = igdb_response(503, headers={"Retry-After": "soon"})
+    delay = IGDBHandler._retry_delay(attempt, response)
+
+    base_delay = REQUEST_RETRY_BASE_DELAY * 2**attempt
+    assert base_delay <= delay <= base_delay * 1.5
+
+
+def test_retry_delay_backoff_is_capped():
+    assert IGDBHandler._retry_delay(20) == REQUEST_MAX_RETRY_DELAY
+
+
+@pytest.mark.parametrize("status_code", sorted(RETRYABLE_STATUS_CODES))
+async def test_request_retries(igdb, httpx_client, sleep_mock, status_code):
+    httpx_client.post.side_effect = [
+        igdb_response(status_code, headers={"Retry-After": "1"}),
+        igdb_response(200, b'[{"id": 3340}]'),
+    ]
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        roms = await igdb._request(GAMES_URL, "fields id;")
+
+    assert roms == [{"id": 3340}]
+    assert httpx_client.post.await_count == 2
+    sleep_mock.assert_awaited_once_with(1.0)
+    assert igdb._consecutive_failures == 0
+
+
+async def test_request_gives_up_after_max_attempts(igdb, httpx_client, sleep_mock):
+    httpx_client.post.return_value = igdb_response(503)
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        roms = await igdb._request(GAMES_URL, "fields id;")
+
+    assert roms == []
+    assert httpx_client.post.await_count == REQUEST_MAX_ATTEMPTS
+    assert sleep_mock.await_count == REQUEST_MAX_ATTEMPTS - 1
+    assert igdb._consecutive_failures == 1
+
+
+async def test_request_retries_timeouts(igdb, httpx_client, sleep_mock):
+    httpx_client.post.side_effect = [
+        httpx.ReadTimeout("timed out"),
+        igdb_response(200, b'[{"id": 3340}]'),
+    ]
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        roms = await igdb._request(GAMES_URL, "fields id;")
+
+    assert roms == [{"id": 3340}]
+    assert sleep_mock.await_count == 1
+
+
+async def test_request_does_not_retry_client_errors(igdb, httpx_client, sleep_mock):
+    httpx_client.post.return_value = igdb_response(400)
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        roms = await igdb._request(GAMES_URL, "fields id;")
+
+    assert roms == []
+    assert httpx_client.post.await_count == 1
+    sleep_mock.assert_not_awaited()
+    # IGDB answered, a bad request doesn't count as a failure
+    assert igdb._consecutive_failures == 0
+
+
+async def test_circuit_opens_after_consecutive_failures(igdb, httpx_client):
+    httpx_client.post.side_effect = httpx.ConnectError("unreachable")
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        for _ in range(CIRCUIT_BREAKER_FAIL_THRESHOLD):
+            with pytest.raises(HTTPException):
+                await igdb._request(GAMES_URL, "fields id;")
+
+        # Open: fail fast without calling IGDB
+        assert await igdb._request(GAMES_URL, "fields id;") == []
+
+    assert httpx_client.post.await_count == CIRCUIT_BREAKER_FAIL_THRESHOLD
+
+
+async def test_circuit_half_open_allows_a_single_probe(igdb, httpx_client):
+    open_circuit(igdb, time.time() - CIRCUIT_BREAKER_COOLDOWN)
+    release_probe = asyncio.Event()
+
+    async def post(*args, **kwargs):
+        await release_probe.wait()
+        return igdb_response(200, b'[{"id": 3340}]')
+
+    httpx_client.post.side_effect = post
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        probe = asyncio.create_task(igdb._request(GAMES_URL, "fields id;"))
+        while not httpx_client.post.await_count:
+            await asyncio.sleep(0)
+
+        # The other requests keep failing fast while the probe is in flight
+        assert await igdb._request(GAMES_URL, "fields name;") == []
+        assert httpx_client.post.await_count == 1
+
+        release_probe.set()
+        assert await probe == [{"id": 3340}]
+
+    # Closed again
+    assert not igdb._circuit_probing
+    assert not igdb._circuit_open()
+
+
+async def test_circuit_reopens_when_probe_fails(igdb, httpx_client, sleep_mock):
+    open_circuit(igdb, time.time() - CIRCUIT_BREAKER_COOLDOWN)
+    httpx_client.post.return_value = igdb_response(503)
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        assert await igdb._request(GAMES_URL, "fields id;") == []
+        assert httpx_client.post.await_count == REQUEST_MAX_ATTEMPTS
+
+        assert not igdb._circuit_probing
+        assert igdb._circuit_open()
+        assert await igdb._request(GAMES_URL, "fields id;") == []
+
+    assert httpx_client.post.await_count == REQUEST_MAX_ATTEMPTS
+
+
+async def test_circuit_probe_released_when_request_raises(igdb, httpx_client):
+    open_circuit(igdb, time.time() - CIRCUIT_BREAKER_COOLDOWN)
+    httpx_client.post.side_effect = httpx.RemoteProtocolError("stream reset")
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        with pytest.raises(httpx.RemoteProtocolError):
+            await igdb._request(GAMES_URL, "fields id;")
+
+    # Still open, but the next request can probe IGDB again
+    assert not igdb._circuit_probing
+    assert not igdb._circuit_open()
+
+
+async def test_request_shares_identical_inflight_requests(igdb, httpx_client):
+    release_response = asyncio.Event()
+
+    async def post(*args, **kwargs):
+        await release_response.wait()
+        return igdb_response(200, b'[{"id": 3340}]')
+
+    httpx_client.post.side_effect = post
+
+    async with set_context_var(ctx_httpx_client, httpx_client):
+        requests = asyncio.gather(
+            igdb._request(GAMES_URL, "fields id;"),
+            igdb._request(GAMES_URL, "fields id;"),
+        )
+        while not httpx_client.post.await_count:
+            await asyncio.sleep(0)
+
+        release_response.set()
+        assert await requests == [[{"id": 3340}], [{"id": 3340}]]
+
+        # Later identical requests are served from the cache
+        assert await igdb._request(GAMES_URL, "fields id;") == [{"id": 3340}]
+
+    assert httpx_client.post.await_count == 1
+
+
+async def test_get_roms_batch_splits_names_in_batches(igdb):
+    file_names = [f"Game {i} (USA).z64" for i in range(150)]
+
+    with patch.object(igdb, "_request", new_callable=AsyncMock) as request_mock:
+        request_mock.side_effect = [
+            [{"id": 1, "name": "Game 0"}],
+            [{"id": 2, "name": "Game 149"}],
+        ]
+        roms = await igdb.get_roms_batch(file_names, 4)
+
+    batch_size = igdb.pagination_limit // 2
+    assert request_mock.await_count == 2
+    first_batch, second_batch = (call.args[1] for call in request_mock.await_args_list)
+    assert first_batch.count('"Game ') == batch_size
+    assert second_batch.count('"Game ') == len(file_names) - batch_size
+
+    assert roms.keys() == {"Game 0 (USA).z64", "Game 149 (USA).z64"}
+    assert roms["Game 0 (USA).z64"]["igdb_id"] == 1
+    assert roms["Game 149 (USA).z64"]["igdb_id"] == 2
+
+
+async def test_get_roms_batch_prefers_main_games(igdb):
+    with patch.object(igdb, "_request", new_callable=AsyncMock) as request_mock:
+        request_mock.return_value = [
+            {"id": 1, "name": "Paper Mario", "category": 3},
+            {"id": 2, "name": "paper mario", "category": EXPANDED_GAME_CATEGORY},
+            {"id": 3340, "name": "Paper Mario", "category": MAIN_GAME_CATEGORY},
+        ]
+        roms = await igdb.get_roms_batch(["Paper Mario (USA).z64"], 4)
+
+    assert roms["Paper Mario (USA).z64"]["igdb_id"] == 3340
+    assert roms["Paper Mario (USA).z64"]["name"] == "Paper Mario"
+
+
+async def test_get_roms_batch_skips_misses(igdb):
+    with patch.object(igdb, "_request", new_callable=AsyncMock) as request_mock:
+        request_mock.return_value = [{"id": 3340, "name": "Paper Mario"}]
+        roms = await igdb.get_roms_batch(
+            ["Paper Mario (USA).z64", "Not A Real Game (USA).z64"], 4
+        )
+
+    assert request_mock.await_count == 1
+    assert list(roms.keys()) == ["Paper Mario (USA).z64"]
+
+
+async def test_get_roms_batch_matches_get_rom(igdb):
+    # A main game with a close name and an expanded game with the exact name
+    main_game = {"id": 3340, "name": "Paper Mario 64", "slug": "paper-mario-64"}
+    expanded_game = {"id": 1, "name": "Paper Mario", "slug": "paper-mario-remix"}
+
+    async def request(url, data, **kwargs):
+        if "name=(" in data:
+            return [{**expanded_game, "category": EXPANDED_GAME_CATEGORY}]
+        if not data.startswith("search"):
+            return []
+        if f"category={MAIN_GAME_CATEGORY}" in data:
+            return [main_game]
+        return [expanded_game, main_game]
+
+    file_name = "Paper Mario (USA).z64"
+    with patch.object(igdb, "_request", side_effect=request):
+        batch_roms = await igdb.get_roms_batch([file_name], 4)
+        scanned_rom = batch_roms.get(file_name) or await igdb.get_rom(file_name, 4)
+        rom = await igdb.get_rom(file_name, 4)
+
+    assert file_name not in batch_roms
+    assert scanned_rom["igdb_id"] == rom["igdb_id"] == 3340
@@ -17,7 +17,15 @@ class FileFormatter(logging.Formatter):
         logging.CRITICAL:   level + dots + identifier_critical + date + msg
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Build the per level formatters once instead of on every record
+        self._formatters: dict = {
+            level: logging.Formatter(fmt=log_fmt, datefmt='%Y-%m-%d %H:%M:%S')
+            for level, log_fmt in self.FORMATS.items()
+        }
+        self._default_formatter = logging.Formatter(datefmt='%Y-%m-%d %H:%M:%S')
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(fmt=log_fmt, datefmt='%Y-%m-%d %H:%M:%S')
+        formatter = self._formatters.get(record.levelno, self._default_formatter)
         return formatter.format(record)
\ No newline at end of file
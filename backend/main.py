@@ -1,5 +1,6 @@
 import re
 import sys
+from contextlib import asynccontextmanager
 
 import alembic.config
 import uvicorn
@@ -21,7 +22,7 @@ from endpoints import (
     screenshots,
 )
 import endpoints.sockets.scan  # noqa
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 from handler import auth_handler, db_user_handler, github_handler, socket_handler
@@ -30,8 +31,32 @@ from handler.auth_handler.hybrid_auth import HybridAuthBackend
 from handler.auth_handler.middleware import CustomCSRFMiddleware
 from starlette.middleware.authentication import AuthenticationMiddleware
 from starlette_authlib.middleware import AuthlibMiddleware as SessionMiddleware
+from utils.context import (
+    create_httpx_client,
+    ctx_httpx_client,
+    initialize_context,
+    set_context_var,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Event to handle RomM startup and shutdown logic."""
+
+    if "pytest" not in sys.modules:
+        # Create default admin user if no admin user exists
+        if len(db_user_handler.get_admin_users()) == 0:
+            auth_handler.create_default_admin_user()
 
-app = FastAPI(title="RomM API", version=github_handler.get_version())
+    # Single HTTP client shared by every request, so connections are reused
+    async with create_httpx_client() as httpx_client:
+        app.state.httpx_client = httpx_client
+        yield
+
+
+app = FastAPI(
+    title="RomM API", version=github_handler.get_version(), lifespan=lifespan
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -64,6 +89,21 @@ app.add_middleware(
     jwt_alg=ALGORITHM,
 )
 
+
+@app.middleware("http")
+async def set_context(request: Request, call_next):
+    """Expose the shared HTTP client to the handlers through its context var"""
+
+    httpx_client = getattr(request.app.state, "httpx_client", None)
+    if httpx_client:
+        async with set_context_var(ctx_httpx_client, httpx_client):
+            return await call_next(request)
+
+    # Lifespan didn't run (e.g. bare TestClient), use a short-lived client
+    async with initialize_context():
+        return await call_next(request)
+
+
 app.include_router(heartbeat.router)
 app.include_router(auth.router)
 app.include_router(user.router)
@@ -83,18 +123,6 @@ add_pagination(app)
 app.mount("/ws", socket_handler.socket_app)
 
 
-@app.on_event("startup")
-def startup() -> None:
-    """Event to handle RomM startup logic."""
-
-    if "pytest" in sys.modules:
-        return
-
-    # Create default admin user if no admin user exists
-    if len(db_user_handler.get_admin_users()) == 0:
-        auth_handler.create_default_admin_user()
-
-
 if __name__ == "__main__":
     # Run migrations
     alembic.config.main(argv=["upgrade", "head"])
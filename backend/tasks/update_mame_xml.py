@@ -21,5 +21,14 @@ class UpdateMAMEXMLTask(RemoteFilePullTask):
             file_path=FIXTURE_FILE_PATH,
         )
 
+    async def run(self, force: bool = False):
+        from handler.igdb_handler import _load_mame_index
+
+        content = await super().run(force)
+        if content is None:
+            return
+
+        _load_mame_index.cache_clear()
+
 
 update_mame_xml_task = UpdateMAMEXMLTask()
@@ -1,8 +1,8 @@
-import json
 import os
 from pathlib import Path
 from typing import Final
 
+import orjson
 from config import (
     ENABLE_SCHEDULED_UPDATE_SWITCH_TITLEDB,
     SCHEDULED_UPDATE_SWITCH_TITLEDB_CRON,
@@ -36,15 +36,25 @@ class UpdateSwitchTitleDBTask(RemoteFilePullTask):
         )
 
     async def run(self, force: bool = False):
+        from handler.igdb_handler import (
+            _load_switch_product_id_index,
+            _load_switch_titledb_index,
+        )
+
         content = await super().run(force)
         if content is None:
             return
 
-        index_json = json.loads(content)
-        product_ids = dict((v["id"], v) for _k, v in index_json.items())
+        _load_switch_titledb_index.cache_clear()
+
+        index_json = orjson.loads(content)
+        product_ids = {v["id"]: v for v in index_json.values()}
 
         with open(SWITCH_PRODUCT_ID_FILE_PATH, "wb") as fixture:
-            fixture.write(json.dumps(product_ids).encode())
+            # Some titles have no id, json.dumps wrote those under "null"
+            fixture.write(orjson.dumps(product_ids, option=orjson.OPT_NON_STR_KEYS))
+
+        _load_switch_product_id_index.cache_clear()
 
 
 update_switch_titledb_task = UpdateSwitchTitleDBTask()
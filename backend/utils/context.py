@@ -0,0 +1,52 @@
+import contextlib
+from contextvars import ContextVar
+from typing import AsyncGenerator, TypeVar
+
+import httpx
+
+_T = TypeVar("_T")
+
+ctx_httpx_client: ContextVar[httpx.AsyncClient] = ContextVar("httpx_client")
+
+
+def create_httpx_client() -> httpx.AsyncClient:
+    """Create the HTTP client shared by the metadata handlers
+
+    IGDB is a single host, so HTTP/2 lets concurrent queries share one connection.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=20, max_connections=50, keepalive_expiry=60.0
+        ),
+        timeout=httpx.Timeout(120.0, connect=10.0),
+    )
+
+
+@contextlib.asynccontextmanager
+async def set_context_var(var: ContextVar[_T], value: _T) -> AsyncGenerator[None, None]:
+    """Temporarily set a context variable for the current context
+
+    Args:
+        var: context variable to set
+        value: value to set the context variable to
+    """
+    token = var.set(value)
+    try:
+        yield
+    finally:
+        var.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def initialize_context() -> AsyncGenerator[None, None]:
+    """Initialize the context for code running outside of a request (e.g. rq jobs)
+
+    Can be used both as an async context manager and as a decorator:
+
+        @initialize_context()
+        async def job(): ...
+    """
+    async with create_httpx_client() as httpx_client:
+        async with set_context_var(ctx_httpx_client, httpx_client):
+            yield